@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+
+from src.replay_analytics import analyze_replays, find_replays
+from src.tournament import write_csv
+import argparse
+import os
+import time
+
+def main():
+    parser = argparse.ArgumentParser(description="Extract per-turn tables and per-match metrics from replays")
+    parser.add_argument("replays", type=str, nargs="*", default=["replays"], help="Replays, or directories of replays (default: replays)")
+    parser.add_argument("-o", "--output_dir", type=str, default="analytics", help="Directory for the per-turn tables and summary.csv")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="Number of replays to decode at once (default: number of cores)")
+    parser.add_argument("-f", "--force", action="store_true", help="Rebuild tables even if they are newer than their replays")
+    args = parser.parse_args()
+
+    paths = find_replays(args.replays)
+    if len(paths) == 0:
+        print(f"No replays found in {' '.join(args.replays)}")
+        return
+    start = time.perf_counter()
+    rows = analyze_replays(paths, args.output_dir, args.workers, args.force)
+    summary_path = os.path.join(args.output_dir, "summary.csv")
+    write_csv(summary_path, rows)
+    print(f"Analyzed {len(rows)} of {len(paths)} replays in {time.perf_counter() - start:.1f}s; summary in {summary_path}")
+
+if __name__ == "__main__":
+    main()
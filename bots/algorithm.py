@@ -2,7 +2,6 @@ from src.player import Player
 from src.map import Map
 from src.robot_controller import RobotController
 from src.game_constants import TowerType, Team, Tile, GameConstants, SnipePriority, get_debris_schedule
-from src.debris import Debris
 from src.tower import Tower
  
 
@@ -400,13 +399,7 @@ class BotPlayer(Player):
     # ---- attack functions ---- #
 
     def towers_attack(self, rc):
-        towers = rc.get_towers(self.team)
-
-        for tower in towers:
-            if tower.type == TowerType.GUNSHIP:
-                rc.auto_snipe(tower.id, SnipePriority.FIRST)
-            elif tower.type == TowerType.BOMBER:
-                rc.auto_bomb(tower.id)
+        rc.auto_attack(SnipePriority.FIRST)
 
     # ---- attack functions ---- #
 
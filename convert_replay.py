@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+
+from src.replay_io import DeltaReplaySink, get_replay_path, load_replay
+import argparse
+import os
+
+def convert(path: str, output_dir: str, keyframe_interval: int) -> str:
+    replay = load_replay(path)
+    metadata = replay["metadata"]
+    game_name = os.path.basename(path).split(".")[0]
+    output_dir = output_dir or os.path.dirname(path)
+    os.makedirs(output_dir, exist_ok=True)
+    out_path = get_replay_path(output_dir, game_name, "delta")
+    if os.path.abspath(out_path) == os.path.abspath(path):
+        raise Exception(f"Converting {path} would overwrite it; pass a different --output_dir")
+
+    sink = DeltaReplaySink(out_path, metadata, keyframe_interval)
+    for turn in replay["turns"]:
+        sink.write_turn(turn)
+    sink.close(metadata)
+    return out_path
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert replays to the keyframe + delta format")
+    parser.add_argument("replays", type=str, nargs="+", help="Paths to .awap24r or .awap24r.gz replays")
+    parser.add_argument("-o", "--output_dir", type=str, default=None, help="Directory for converted replays (default: next to the input)")
+    parser.add_argument("-k", "--keyframe_interval", type=int, default=100, help="Number of turns between full keyframes")
+    args = parser.parse_args()
+
+    for path in args.replays:
+        out_path = convert(path, args.output_dir, args.keyframe_interval)
+        print(f"{path} ({os.path.getsize(path)} bytes) -> {out_path} ({os.path.getsize(out_path)} bytes)")
+
+if __name__ == "__main__":
+    main()
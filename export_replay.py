@@ -0,0 +1,27 @@
+#!/usr/bin/env python3
+
+from src.replay_export import export_replay
+import argparse
+import time
+
+def main():
+    parser = argparse.ArgumentParser(description="Export a replay as an animated GIF or a sequence of PNGs, without a display")
+    parser.add_argument("replay", type=str, help="Path to a replay in any format")
+    parser.add_argument("-o", "--output", type=str, required=True,
+                        help="A .gif file, or a directory to write numbered PNGs to")
+    parser.add_argument("--start", type=int, default=0, help="Index of the first turn to export")
+    parser.add_argument("--end", type=int, default=None, help="Index of the turn to stop before (default: the last turn)")
+    parser.add_argument("--every", type=int, default=1, help="Export every n-th turn")
+    parser.add_argument("--fps", type=float, default=30, help="Frames per second of the GIF")
+    parser.add_argument("--tile_size", type=int, default=10, help="Size of a map tile in pixels")
+    parser.add_argument("-m", "--map_path", type=str, default=None, help="Map the replay was played on (default: maps/<map name>.awap24m)")
+    parser.add_argument("-p", "--processes", type=int, default=None, help="Number of worker processes (default: one per CPU)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    num_frames = export_replay(args.replay, args.output, args.map_path, args.start, args.end, args.every,
+                               args.fps, args.tile_size, args.processes)
+    print(f"Exported {num_frames} frames to {args.output} in {time.perf_counter() - start:.1f}s")
+
+if __name__ == "__main__":
+    main()
@@ -1,71 +1,200 @@
-import json
-import compress_json
-from colorama import Fore, Back, Style, init
-import time
+#!/usr/bin/env python3
 
-init(autoreset=True)  
+# Terminal replay viewer
+# The grid is drawn in place: each turn, the cursor is moved to just the cells
+# that changed since the last turn and only those are written, so a turn costs
+# a few bytes instead of the whole grid. Turns are decoded as they are shown.
+# Keys while watching:
+#   space -> pause or resume
+#   + / - -> double or halve the speed
+#   q     -> quit
 
-# Command line argument for the replay file path
+from src.replay_io import ReplayReader
+from colorama import Fore, Style, init
+import argparse
+import os
 import sys
-if len(sys.argv) > 1:
-    REPLAY_FILE_PATH = sys.argv[1]
-else:
-    print("Please provide the replay file path as a command line argument.")
-    print("Example: python3 replay_game.py <filename>.awap24r")
-    exit()
-
-def load_replay(file_path):
-    if file_path.endswith('.awap24r.gz'):
-        replay_data = compress_json.load(REPLAY_FILE_PATH)
-    elif file_path.endswith('.awap24r'):
-        with open(file_path, 'r') as file:
-            replay_data = json.load(file)
-    else:
-        print("Please provide a valid replay file.")
-    return replay_data
-
-def visualize_turn(turn, metadata):
-    # Create a grid with the path
-    grid = [[' ' for _ in range(metadata['map_width'])] for _ in range(metadata['map_height'])]
-    for path_coord in metadata['map_path']:
-        x, y = path_coord
-        grid[y][x] = Fore.RESET + Back.RESET + '-'
-
-    # Add towers to the grid
+import time
+
+CLEAR_SCREEN = "\x1b[2J"
+HIDE_CURSOR = "\x1b[?25l"
+SHOW_CURSOR = "\x1b[?25h"
+CLEAR_LINE = "\x1b[K"
+EMPTY_CELL = (Fore.RESET, ' ')
+
+def move_to(row: int, col: int) -> str:
+    return f"\x1b[{row + 1};{col + 1}H"
+
+def get_grid_size(metadata: dict) -> tuple:
+    # Older replays recorded the map's height as its width, so make room for the whole path
+    width = max([metadata['map_width']] + [x + 1 for x, y in metadata['map_path']])
+    height = max([metadata['map_height']] + [y + 1 for x, y in metadata['map_path']])
+    return width, height
+
+def get_cells(turn: dict, path_cells: dict, width: int, height: int) -> dict:
+    '''
+    Returns the (style, character) of every non-empty cell of the grid, by (x, y).
+    '''
+    cells = dict(path_cells)
+
+    def put(x, y, cell):
+        if 0 <= x < width and 0 <= y < height:
+            cells[(x, y)] = cell
+
+    # Towers, lowercase while on cooldown
     for tower in turn['blue_towers']:
-        grid[tower['y']][tower['x']] = Fore.BLUE + 'B' if tower.get('cooldown', 0) == 0 else Fore.CYAN + 'b'  # Blue tower or bomb
+        put(tower['x'], tower['y'], (Fore.BLUE, 'B') if tower.get('cooldown', 0) == 0 else (Fore.CYAN, 'b'))
     for tower in turn['red_towers']:
-        grid[tower['y']][tower['x']] = Fore.RED + 'R' if tower.get('cooldown', 0) == 0 else Fore.MAGENTA + 'r'  # Red tower or bomb
-
-    # Add balloons to the grid
-    for balloon in turn['blue_bombs']:
-        x, y = balloon
-        grid[y][x] = Fore.BLUE + 'B'
-    for balloon in turn['red_bombs']:
-        x, y = balloon
-        grid[y][x] = Fore.RED + 'R'
-
-    # Display the grid 
-    for row in grid:
-        print(' '.join(row))
-
-    print(f"Turn Number: {turn['turn_number']}")
-    print(f"Red Balance: {turn['red_balance']}, Blue Balance: {turn['blue_balance']}")
-    time.sleep(0.001)  # Adjust replay speed
-
-# Load game replay from file
-replay = load_replay(REPLAY_FILE_PATH)
-
-# Parse metadata
-metadata = replay['metadata']
-game_name = metadata['game_name']
-print(f"Game Name: {metadata['game_name']}")
-print(f"Map Name: {metadata['map_name']}")
-print(f"Map Size: {metadata['map_width']}x{metadata['map_height']}")
-print(f"Players: {metadata['red_bot']} vs {metadata['blue_bot']}")
-time.sleep(1)
-
-
-# Visualize each turn
-for turn in replay['turns']:
-    visualize_turn(turn, metadata)
\ No newline at end of file
+        put(tower['x'], tower['y'], (Fore.RED, 'R') if tower.get('cooldown', 0) == 0 else (Fore.MAGENTA, 'r'))
+
+    # Bombs
+    for x, y in turn['blue_bombs']:
+        put(x, y, (Fore.BLUE, 'B'))
+    for x, y in turn['red_bombs']:
+        put(x, y, (Fore.RED, 'R'))
+    return cells
+
+class TerminalView:
+    '''
+    Keeps what is on screen and redraws only what changes.
+    '''
+    def __init__(self, out, height: int):
+        self.out = out
+        self.height = height
+        self.cells = {}
+        self.status = []
+
+    def start(self):
+        self.out.write(HIDE_CURSOR + CLEAR_SCREEN)
+        self.out.flush()
+
+    def stop(self):
+        self.out.write(move_to(self.height + len(self.status), 0) + Style.RESET_ALL + SHOW_CURSOR + "\n")
+        self.out.flush()
+
+    def draw(self, cells: dict, status: list):
+        parts = []
+        style = None
+        cursor = None
+        changed = [pos for pos in cells.keys() | self.cells.keys() if cells.get(pos) != self.cells.get(pos)]
+        changed.sort(key=lambda pos: (pos[1], pos[0]))
+        for x, y in changed:
+            cell_style, char = cells.get((x, y), EMPTY_CELL)
+            # Cells are two columns wide; writing both leaves the cursor on the next cell
+            if cursor != (x, y):
+                parts.append(move_to(y, 2 * x))
+            if cell_style != style:
+                parts.append(cell_style)
+                style = cell_style
+            parts.append(char + ' ')
+            cursor = (x + 1, y)
+
+        for i, line in enumerate(status):
+            if i >= len(self.status) or self.status[i] != line:
+                parts.append(move_to(self.height + i, 0) + Style.RESET_ALL + line + CLEAR_LINE)
+                style = None
+        if parts:
+            self.out.write("".join(parts))
+            self.out.flush()
+        self.cells = cells
+        self.status = status
+
+class Keys:
+    '''
+    Reads single key presses without waiting for enter. When stdin isn't a terminal,
+    no keys are ever pressed.
+    '''
+    def __enter__(self):
+        self.tty = sys.stdin.isatty()
+        self.saved = None
+        if self.tty and os.name != 'nt':
+            import termios
+            import tty
+            self.saved = termios.tcgetattr(sys.stdin)
+            tty.setcbreak(sys.stdin)
+        return self
+
+    def __exit__(self, *args):
+        if self.saved is not None:
+            import termios
+            termios.tcsetattr(sys.stdin, termios.TCSADRAIN, self.saved)
+
+    def read(self, timeout) -> str:
+        '''
+        Returns the keys pressed within timeout seconds, or waits for one if timeout is None.
+        '''
+        if not self.tty:
+            if timeout:
+                time.sleep(timeout)
+            return ''
+        if os.name == 'nt':
+            import msvcrt
+            end = None if timeout is None else time.perf_counter() + timeout
+            while not msvcrt.kbhit():
+                if end is not None and time.perf_counter() >= end:
+                    return ''
+                time.sleep(0.01)
+            return msvcrt.getwch()
+        import select
+        ready, _, _ = select.select([sys.stdin], [], [], timeout)
+        return os.read(sys.stdin.fileno(), 32).decode(errors='ignore') if ready else ''
+
+def get_status(turn: dict, metadata: dict, speed: float, paused: bool) -> list:
+    playback = "paused" if paused else (f"{speed:g} turns/s" if speed > 0 else "max speed")
+    return [
+        f"Turn Number: {turn['turn_number']}",
+        f"Red Balance: {turn['red_balance']}, Blue Balance: {turn['blue_balance']}",
+        f"{metadata['game_name']} on {metadata['map_name']}: {metadata['red_bot']} vs {metadata['blue_bot']}",
+        f"{playback}   space: pause  +/-: speed  q: quit"
+    ]
+
+def play(replay: ReplayReader, start: int, stop: int, speed: float):
+    metadata = replay.metadata
+    width, height = get_grid_size(metadata)
+    path_cells = {(x, y): (Fore.RESET, '-') for x, y in metadata['map_path']}
+    view = TerminalView(sys.stdout, height)
+    paused = False
+    view.start()
+    try:
+        with Keys() as keys:
+            next_frame = time.perf_counter()
+            for turn in replay.get_turns(start, stop):
+                cells = get_cells(turn, path_cells, width, height)
+                view.draw(cells, get_status(turn, metadata, speed, paused))
+                next_frame = max(next_frame + (1 / speed if speed > 0 else 0), time.perf_counter() - 1)
+
+                # Wait for the next frame, handling keys in the meantime
+                while paused or time.perf_counter() < next_frame:
+                    pressed = keys.read(None if paused else next_frame - time.perf_counter())
+                    for key in pressed:
+                        if key == 'q':
+                            return
+                        elif key == ' ':
+                            paused = not paused
+                            next_frame = time.perf_counter()
+                        elif key == '+' and speed > 0:
+                            speed *= 2
+                        elif key == '-' and speed > 0:
+                            speed /= 2
+                    if pressed:
+                        view.draw(cells, get_status(turn, metadata, speed, paused))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        view.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description="Watch a replay in the terminal")
+    parser.add_argument("replay", type=str, help="Path to a replay in any format")
+    parser.add_argument("--from", dest="start", type=int, default=0, help="Index of the first turn to show")
+    parser.add_argument("--to", dest="stop", type=int, default=None, help="Index of the turn to stop before (default: the last turn)")
+    parser.add_argument("-s", "--speed", type=float, default=30, help="Turns shown per second (0 shows them as fast as the terminal takes them)")
+    args = parser.parse_args()
+
+    init()
+    with ReplayReader(args.replay) as replay:
+        stop = len(replay) if args.stop is None else args.stop
+        play(replay, args.start, stop, args.speed)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+
+from src.replay_io import REPLAY_FORMATS
+from src.resimulate import resimulate
+import argparse
+import os
+import sys
+
+def main():
+    parser = argparse.ArgumentParser(description="Play games again from their action logs and check they turn out the same")
+    parser.add_argument("logs", type=str, nargs="+", help="Action logs (.awap24a.jsonl.gz), or directories of them")
+    parser.add_argument("-m", "--map_path", type=str, default=None, help="Map the games were played on (default: maps/<map name>.awap24m)")
+    parser.add_argument("--replay_dir", type=str, default="replays", help="Directory to write full replays to")
+    parser.add_argument("--replay_format", type=str, default="none", choices=[format for format in REPLAY_FORMATS if format != "actions"],
+                        help="Also write each game as a full replay in this format")
+    args = parser.parse_args()
+
+    paths = []
+    for path in args.logs:
+        if os.path.isdir(path):
+            paths.extend(sorted(os.path.join(path, name) for name in os.listdir(path) if name.endswith(".awap24a.jsonl.gz")))
+        else:
+            paths.append(path)
+
+    mismatches = 0
+    for path in paths:
+        result = resimulate(path, args.map_path, args.replay_dir, args.replay_format)
+        if result.mismatch is None:
+            print(f"OK        {path}: {result.winner} wins in {result.turns} turns ({result.seconds:.1f}s)")
+        else:
+            mismatches += 1
+            print(f"MISMATCH  {path}: {result.mismatch}")
+    print(f"{len(paths) - mismatches} of {len(paths)} games played out the same")
+    if mismatches:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+
+from src.benchmark import compare, get_scenarios, run_scenario
+import argparse
+import json
+import os
+import sys
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the engine and compare against a baseline")
+    parser.add_argument("-s", "--scenarios", type=str, nargs="+", required=False,
+                        help="Only run scenarios whose name starts with one of these (e.g. map/ towers/200)")
+    parser.add_argument("-r", "--repeats", type=int, default=5, help="Timed runs per scenario; the fastest is kept")
+    parser.add_argument("-t", "--threshold", type=float, default=0.25, help="Largest allowed drop in turns per second, as a fraction")
+    parser.add_argument("--size_threshold", type=float, default=0.05, help="Largest allowed growth in peak memory and replay size, as a fraction")
+    parser.add_argument("--baseline", type=str, default="benchmarks/baseline.json", help="Baseline to compare against")
+    parser.add_argument("--update_baseline", action="store_true", help="Write the results to the baseline instead of comparing")
+    parser.add_argument("-o", "--output", type=str, required=False, help="Also write the results to this .json file")
+    parser.add_argument("--no_memory", action="store_true", help="Skip measuring peak memory")
+    parser.add_argument("--no_replays", action="store_true", help="Skip measuring replay sizes")
+    args = parser.parse_args()
+
+    scenarios = get_scenarios()
+    if args.scenarios:
+        scenarios = [scenario for scenario in scenarios if any(scenario.name.startswith(prefix) for prefix in args.scenarios)]
+
+    results = {}
+    print(f"{'scenario':<24}{'turns':>7}{'turns/s':>10}{'peak kB':>10}{'json B':>10}{'delta B':>10}")
+    for scenario in scenarios:
+        result = run_scenario(scenario, args.repeats, memory=not args.no_memory, replays=not args.no_replays)
+        results[scenario.name] = result
+        print(f"{scenario.name:<24}{result['turns']:>7}{result['turns_per_sec']:>10.1f}{result.get('peak_memory_kb', ''):>10}"
+              f"{result.get('replay_bytes_json', ''):>10}{result.get('replay_bytes_delta', ''):>10}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.update_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        baseline.update(results)
+        os.makedirs(os.path.dirname(args.baseline) or ".", exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=2)
+        print(f"Wrote baseline to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --update_baseline to create one")
+        return
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.threshold, args.size_threshold)
+    if regressions:
+        print(f"{len(regressions)} regressions against {args.baseline}:")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
+    print(f"No regressions against {args.baseline}")
+
+if __name__ == "__main__":
+    main()
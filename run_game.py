@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 
 from src.game import Game
+from src.replay_io import REPLAY_FORMATS
 import argparse
 import json
 
@@ -11,6 +12,21 @@ def main():
     parser.add_argument("-m", "--map_path", type=str, required=False)
     parser.add_argument("-c", "--config_file", type=str, required=False)
     parser.add_argument("--render", action="store_true", help="Whether or not to display the game while it is running")
+    parser.add_argument("--render_fps", type=float, default=30,
+                        help="Most frames per second to draw with --render; turns in between are not drawn (0 draws every turn)")
+    parser.add_argument("--replay_dir", type=str, default="replays", help="Directory to write the replay to")
+    parser.add_argument("--replay_format", type=str, default="json", choices=REPLAY_FORMATS,
+                        help="json writes the whole replay at the end, stream writes it while the game runs, "
+                             "delta streams it too but stores only the changes between turns, much smaller, "
+                             "actions logs each bot's actions instead of the state, to be played back with resimulate.py "
+                             "rather than the viewers, none writes nothing")
+    parser.add_argument("-s", "--seed", type=int, default=None, help="Seed for the game's randomness (default: random)")
+    parser.add_argument("--timing", action="store_true", help="Time each phase of every turn and write the timings when the game ends")
+    parser.add_argument("--timing_dir", type=str, default="timing", help="Directory to write timings to")
+    parser.add_argument("--workers", action="store_true", help="Run each bot in its own process, both playing each turn concurrently")
+    parser.add_argument("--training", action="store_true",
+                        help="Play as fast as possible: no time limit, replay or rendering, and report turns per second")
+    parser.add_argument("--no_type_checks", action="store_true", help="Skip checking that bots pass ints to the RobotController")
     args = parser.parse_args()
 
     if args.config_file:
@@ -29,10 +45,24 @@ def main():
         blue_path=blue_path,
         red_path=red_path,
         map_path=map_path,
-        render=args.render
+        output_replay=True,
+        render=args.render,
+        render_fps=args.render_fps,
+        use_workers=args.workers,
+        replay_dir=args.replay_dir,
+        replay_format=args.replay_format,
+        seed=args.seed,
+        timing=args.timing,
+        timing_dir=args.timing_dir,
+        training=args.training,
+        check_types=not args.no_type_checks
     )
     winner = game.run_game()
-    print(f"Winner: {winner}")
+    print(f"Winner: {winner} (seed {game.seed})")
+    if args.training:
+        print(f"Played {game.gs.turn} turns in {game.play_seconds:.2f}s ({game.get_turns_per_sec():.0f} turns/s)")
+    if game.timer:
+        game.timer.print_summary()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+
+from src.replay_io import REPLAY_FORMATS
+from src.tournament import get_matches, get_throughput, run_tournament, summarize, write_csv
+import argparse
+import json
+import os
+
+def main():
+    parser = argparse.ArgumentParser(description="Run every pairing of bots on every map")
+    parser.add_argument("-b", "--bots", type=str, nargs="+", required=False, help="Paths to the bots")
+    parser.add_argument("-m", "--maps", type=str, nargs="+", required=False, help="Paths to the maps")
+    parser.add_argument("-n", "--repeats", type=int, default=None, help="Number of games per pairing and map")
+    parser.add_argument("-c", "--config_file", type=str, required=False)
+    parser.add_argument("-w", "--workers", type=int, default=None, help="Number of games to run at once (default: number of cores)")
+    parser.add_argument("-o", "--output_dir", type=str, default="tournament", help="Directory for matches.csv and summary.csv")
+    parser.add_argument("-s", "--seed", type=int, default=None, help="Seed for the whole tournament, to play it again with the same results")
+    parser.add_argument("--self_play", action="store_true", help="Also play each bot against itself")
+    parser.add_argument("--replays", action="store_true", help="Write a replay for every game")
+    parser.add_argument("--replay_dir", type=str, default="replays", help="Directory to write replays to")
+    parser.add_argument("--replay_format", type=str, default="json", choices=REPLAY_FORMATS, help="Format of the replays")
+    parser.add_argument("--render", action="store_true", help="Display every game while it is running")
+    parser.add_argument("--timing", action="store_true", help="Write per-phase timings for every game to <output_dir>/timing")
+    parser.add_argument("--verbose", action="store_true", help="Show output printed by the bots")
+    parser.add_argument("--training", action="store_true", help="Play games as fast as possible, with no time limit, replays or rendering")
+    parser.add_argument("--no_type_checks", action="store_true", help="Skip checking that bots pass ints to the RobotController")
+    args = parser.parse_args()
+
+    configs = json.load(open(args.config_file)) if args.config_file else {}
+    bots = args.bots or configs.get("bots")
+    maps = args.maps or configs.get("maps")
+    repeats = args.repeats or configs.get("repeats", 1)
+    if not bots or not maps:
+        raise Exception("Must provide --bots and --maps if not using --config_file")
+    num_workers = args.workers or configs.get("workers") or os.cpu_count()
+
+    seed = args.seed if args.seed is not None else configs.get("seed")
+    matches = get_matches(bots, maps, repeats, self_play=args.self_play, seed=seed)
+    print(f"Running {len(matches)} games on {num_workers} workers")
+    results = run_tournament(
+        matches,
+        num_workers,
+        output_replay=args.replays,
+        render=args.render,
+        quiet=not args.verbose,
+        replay_dir=args.replay_dir,
+        replay_format=args.replay_format,
+        timing_dir=os.path.join(args.output_dir, "timing") if args.timing else None,
+        training=args.training,
+        check_types=not args.no_type_checks
+    )
+    summary = summarize(results)
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    write_csv(os.path.join(args.output_dir, "matches.csv"), [result.__dict__ for result in results])
+    write_csv(os.path.join(args.output_dir, "summary.csv"), summary)
+
+    print(f"{'bot':<24}{'map':<24}{'games':>6}{'wins':>6}{'losses':>8}{'win rate':>10}")
+    for row in summary:
+        print(f"{row['bot']:<24}{row['map']:<24}{row['games']:>6}{row['wins']:>6}{row['losses']:>8}{row['win_rate']:>10.2%}")
+    throughput = get_throughput(results)
+    print(f"{throughput['turns_per_sec']:.0f} turns/s per game, {throughput['games_per_core_hour']:.0f} games per core-hour")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+
+# Measures how fast a VecEnv steps, with an agent taking random allowed actions
+# Useful for picking the number of games and workers for training on a machine.
+
+from src.game_constants import Team
+from src.vec_env import VecEnv
+import argparse
+import numpy as np
+import time
+
+def main():
+    parser = argparse.ArgumentParser(description="Step many games at once with random actions and report the throughput")
+    parser.add_argument("-m", "--maps", type=str, nargs="+", default=["maps/simple_map1.awap24m"], help="Paths to the maps to play on")
+    parser.add_argument("-n", "--games", type=int, default=16, help="Number of games stepped together")
+    parser.add_argument("-w", "--workers", type=int, default=0, help="Number of worker processes (default: play every game in this process)")
+    parser.add_argument("-o", "--opponent", type=str, default=None, help="Path to the bot the agent plays against (default: no opponent)")
+    parser.add_argument("--team", type=str, default="blue", choices=["blue", "red"], help="Side the agent plays")
+    parser.add_argument("--steps", type=int, default=1000, help="Number of steps to time")
+    parser.add_argument("--max_turns", type=int, default=None, help="End games after this many turns")
+    parser.add_argument("-s", "--seed", type=int, default=None, help="Seed for the games and the actions")
+    parser.add_argument("--verbose", action="store_true", help="Show output printed by the opponent")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    with VecEnv(args.maps, args.games, opponent_path=args.opponent, team=Team[args.team.upper()], num_workers=args.workers,
+                seed=args.seed, max_turns=args.max_turns, quiet=not args.verbose) as env:
+        observation = env.reset()
+        episodes = 0
+        wins = 0
+        start = time.perf_counter()
+        for _ in range(args.steps):
+            # Mostly do nothing, otherwise pick one of the allowed actions at random
+            mask = observation["action_mask"]
+            actions = np.argmax(rng.random(mask.shape) * mask, axis=1)
+            actions[rng.random(args.games) < 0.9] = 0
+            observation, reward, done, info = env.step(actions)
+            episodes += int(done.sum())
+            wins += int(info["won"].sum())
+        seconds = time.perf_counter() - start
+
+    steps = args.steps * args.games
+    print(f"{steps} steps of {args.games} games on {args.workers or 'no'} workers in {seconds:.2f}s: {steps / seconds:.0f} steps/s")
+    print(f"{episodes} games finished, {wins} won by the agent")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+# Replays that record what the bots did instead of the state it led to
+# The engine is deterministic given a game's seed and the bots' actions, so a log
+# of every action is enough to play the game again (see resimulate). The log is a
+# streamed replay (see StreamingReplaySink) of <game>.awap24a.jsonl.gz with one
+# record per turn:
+#   turn  -> turn number
+#   blue  -> the actions blue took this turn, e.g. ["build_tower", "GUNSHIP", x, y, tower id]
+#   red   -> the actions red took this turn
+#   time  -> [blue, red] time remaining after the turn; a bot that ran out of time
+#            has exactly 0 left
+#   check -> a few numbers describing the state after the turn (see get_check), so
+#            a re-simulation can tell on which turn it first went differently
+
+import gzip
+import json
+from src.game_constants import Team, TowerType
+from src.game_state import GameState
+
+# Fields of check, for each team in turn
+CHECK_FIELDS = ["balance", "health", "towers", "debris", "debris_health"]
+
+def encode_action(action: tuple) -> list:
+    if action[0] == "build_tower":
+        _, tower_type, x, y, tower_id = action
+        return ["build_tower", tower_type.name, x, y, tower_id]
+    return [action[0], *action[1:]]
+
+def decode_action(record: list) -> tuple:
+    if record[0] == "build_tower":
+        _, tower_type, x, y, tower_id = record
+        return ("build_tower", TowerType[tower_type], x, y, tower_id)
+    return tuple(record)
+
+def get_check(gs: GameState) -> list:
+    check = []
+    for team in Team:
+        debris = gs.debris[team]
+        check += [gs.balance[team], gs.health[team], len(gs.towers[team]), len(debris), float(debris.health.sum())]
+    return check
+
+def describe_mismatch(expected: list, actual: list) -> str:
+    differences = []
+    for i, (a, b) in enumerate(zip(expected, actual)):
+        if a != b:
+            team = Team(i // len(CHECK_FIELDS)).name.lower()
+            differences.append(f"{team} {CHECK_FIELDS[i % len(CHECK_FIELDS)]} {a} != {b}")
+    return ", ".join(differences)
+
+def get_action_record(gs: GameState, actions: dict) -> dict:
+    '''
+    Returns the record of the turn gs just played, given each team's actions during it.
+    '''
+    return {
+        "turn": gs.turn,
+        "blue": [encode_action(action) for action in actions[Team.BLUE]],
+        "red": [encode_action(action) for action in actions[Team.RED]],
+        "time": [gs.time_remaining[Team.BLUE], gs.time_remaining[Team.RED]],
+        "check": get_check(gs)
+    }
+
+class ActionLogReader:
+    '''
+    Reads an action log from start to end. Iterating yields the turn records; the
+    result of the game is known once they have all been read.
+    '''
+    def __init__(self, path: str):
+        self.path = path
+        self.file = gzip.open(path, "rt")
+        first = json.loads(self.file.readline())
+        if "metadata" not in first:
+            raise Exception(f"{path} is not an action log")
+        self.metadata = first["metadata"]
+        self.result = None
+
+    def __iter__(self):
+        for line in self.file:
+            record = json.loads(line)
+            if "result" in record:
+                self.result = record["result"]
+                return
+            yield record
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        self.file.close()
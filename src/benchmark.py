@@ -0,0 +1,157 @@
+# Benchmarks of the engine on scripted, repeatable scenarios
+# Each scenario fills both sides of a map with the same towers, fast-forwards to
+# the first measured turn, then plays the measured turns with every gunship and
+# bomber attacking each turn. No bot code runs, so only the engine is measured.
+# Each scenario reports:
+#   turns_per_sec  -> best of several timed runs of the measured turns
+#   peak_memory_kb -> peak memory traced while setting up and playing the scenario
+#   replay_bytes   -> size of the measured turns' replay, per replay format
+
+import glob
+import os
+import tempfile
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import List
+from src.game_constants import SnipePriority, Team, TowerType
+from src.game_state import GameState
+from src.map import Map
+from src.replay import Replay
+from src.robot_controller import RobotController
+
+# Towers are placed closest to the path first, cycling through these types
+TOWER_CYCLE = [
+    TowerType.GUNSHIP, TowerType.BOMBER, TowerType.GUNSHIP, TowerType.BOMBER, TowerType.SOLAR_FARM,
+    TowerType.GUNSHIP, TowerType.BOMBER, TowerType.GUNSHIP, TowerType.BOMBER, TowerType.REINFORCER
+]
+REPLAY_FORMATS = ["json", "delta"]
+
+@dataclass
+class Scenario:
+    name: str
+    map_path: str
+    num_towers: int
+    start_turn: int
+    end_turn: int
+
+def get_scenarios(maps_dir="maps") -> List[Scenario]:
+    scenarios = []
+    for map_path in sorted(glob.glob(os.path.join(maps_dir, "*.awap24m"))):
+        name = os.path.basename(map_path).split(".")[0]
+        scenarios.append(Scenario(f"map/{name}", map_path, 20, 1, 1500))
+
+    # Phases of the debris schedule: early waves, the dense mid-game streams, and the
+    # exponentially harder debris after turn 3700
+    spiral = os.path.join(maps_dir, "spiral.awap24m")
+    scenarios.append(Scenario("phase/early", spiral, 50, 1, 1500))
+    scenarios.append(Scenario("phase/mid", spiral, 50, 2400, 3700))
+    scenarios.append(Scenario("phase/late", spiral, 50, 3700, 4700))
+
+    biki_bott = os.path.join(maps_dir, "biki_bott.awap24m")
+    for num_towers in [0, 50, 200]:
+        scenarios.append(Scenario(f"towers/{num_towers}", biki_bott, num_towers, 2400, 3000))
+    return scenarios
+
+def build_towers(gs: GameState, controllers: dict, num_towers: int):
+    path = gs.map.path
+    spaces = [(x, y) for x in range(gs.map.width) for y in range(gs.map.height) if gs.map.is_space(x, y)]
+    spaces.sort(key=lambda loc: (min((loc[0] - px)**2 + (loc[1] - py)**2 for px, py in path), loc))
+    if num_towers > len(spaces):
+        raise Exception(f"Map {gs.map.name} has room for only {len(spaces)} towers")
+    for team in Team:
+        gs.balance[team] = sum(TOWER_CYCLE[i % len(TOWER_CYCLE)].cost for i in range(num_towers))
+        for i, (x, y) in enumerate(spaces[:num_towers]):
+            controllers[team].build_tower(TOWER_CYCLE[i % len(TOWER_CYCLE)], x, y)
+
+def play_turn(gs: GameState, controllers: dict):
+    gs.advance_turn()
+    for team in Team:
+        controller = controllers[team]
+        for tower in list(gs.towers[team].values()):
+            if tower.type == TowerType.GUNSHIP:
+                controller.auto_snipe(tower.id, SnipePriority.FIRST)
+            elif tower.type == TowerType.BOMBER:
+                controller.auto_bomb(tower.id)
+
+def set_up(scenario: Scenario):
+    '''
+    Returns the game state and controllers of a scenario, just before its first measured turn.
+    '''
+    gs = GameState(Map(scenario.map_path))
+    for team in Team:
+        gs.health[team] = 10**12  # nobody loses, however much debris leaks
+    controllers = {team: RobotController(team, gs) for team in Team}
+    build_towers(gs, controllers, scenario.num_towers)
+    while gs.turn < scenario.start_turn - 1:
+        play_turn(gs, controllers)
+    return gs, controllers
+
+def time_scenario(scenario: Scenario) -> float:
+    gs, controllers = set_up(scenario)
+    start = time.perf_counter()
+    while gs.turn < scenario.end_turn - 1:
+        play_turn(gs, controllers)
+    return (scenario.end_turn - scenario.start_turn) / (time.perf_counter() - start)
+
+def trace_memory(scenario: Scenario) -> int:
+    tracemalloc.start()
+    try:
+        gs, controllers = set_up(scenario)
+        while gs.turn < scenario.end_turn - 1:
+            play_turn(gs, controllers)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def measure_replays(scenario: Scenario) -> dict:
+    gs, controllers = set_up(scenario)
+    with tempfile.TemporaryDirectory() as output_dir:
+        replays = {format: Replay("benchmark", gs.map, "blue", "red", output_dir=os.path.join(output_dir, format), format=format)
+                   for format in REPLAY_FORMATS}
+        while gs.turn < scenario.end_turn - 1:
+            play_turn(gs, controllers)
+            for replay in replays.values():
+                replay.add_turn(gs)
+        sizes = {}
+        for format, replay in replays.items():
+            replay.set_winner(Team.BLUE)
+            replay.close()
+            sizes[format] = sum(os.path.getsize(path) for path in glob.glob(os.path.join(output_dir, format, "*.awap24r*"))
+                                if not path.endswith(".idx"))
+        return sizes
+
+def run_scenario(scenario: Scenario, repeats=5, memory=True, replays=True) -> dict:
+    result = {
+        "turns": scenario.end_turn - scenario.start_turn,
+        "turns_per_sec": round(max(time_scenario(scenario) for _ in range(repeats)), 1)
+    }
+    if memory:
+        result["peak_memory_kb"] = round(trace_memory(scenario) / 1024)
+    if replays:
+        for format, size in measure_replays(scenario).items():
+            result[f"replay_bytes_{format}"] = size
+    return result
+
+def compare(results: dict, baseline: dict, speed_threshold: float, size_threshold: float) -> List[str]:
+    '''
+    Returns a description of every metric that is worse than the baseline by more than its
+    threshold. Speed varies from run to run, so it gets its own, looser threshold; memory and
+    replay sizes barely change unless the engine does.
+    '''
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        for metric, value in result.items():
+            if metric == "turns" or metric not in base:
+                continue
+            change = (value - base[metric]) / base[metric] if base[metric] else 0
+            if metric == "turns_per_sec":
+                regressed = change < -speed_threshold
+            else:
+                regressed = change > size_threshold
+            if regressed:
+                regressions.append(f"{name} {metric}: {base[metric]} -> {value} ({change:+.1%})")
+    return regressions
@@ -0,0 +1,160 @@
+# Runs a player's bot in its own long-lived process
+# The engine sends a snapshot of the game state at the start of each turn, the
+# bot plays against a local copy of it, and the actions it took are sent back
+# to be applied to the real game state.
+
+import copy
+import multiprocessing
+import pickle
+import traceback
+from multiprocessing.connection import Connection
+from src.game_constants import SnipePriority, Team
+from src.game_state import GameState
+from src.map import Map
+from src.robot_controller import RobotController
+
+class RecordingRobotController(RobotController):
+    '''
+    RobotController that keeps a log of every action that changed the game state.
+    auto_snipe and auto_bomb are logged as the snipe/bomb they resolved to.
+    '''
+    def __init__(self, team: Team, game_state: GameState, check_types=True):
+        super().__init__(team, game_state, check_types=check_types)
+        self.actions = []
+        self.__gs = game_state  # private, like RobotController's, so bots can't reach the engine's state
+
+    def send_debris(self, cooldown: int, health: int):
+        super().send_debris(cooldown, health)
+        self.actions.append(("send_debris", cooldown, health))
+
+    def build_tower(self, tower_type, x: int, y: int):
+        super().build_tower(tower_type, x, y)
+        tower_id = next(reversed(self.__gs.towers[self.get_ally_team()]))
+        self.actions.append(("build_tower", tower_type, x, y, tower_id))
+
+    def sell_tower(self, tower_id: int):
+        super().sell_tower(tower_id)
+        self.actions.append(("sell_tower", tower_id))
+
+    def snipe(self, tower_id: int, debris_id: int):
+        super().snipe(tower_id, debris_id)
+        self.actions.append(("snipe", tower_id, debris_id))
+
+    def bomb(self, tower_id: int):
+        super().bomb(tower_id)
+        self.actions.append(("bomb", tower_id))
+
+    def auto_attack(self, priority=SnipePriority.FIRST, bombers_first=False):
+        fired = super().auto_attack(priority, bombers_first)
+        for tower_id, debris_id in fired:
+            if debris_id is None:
+                self.actions.append(("bomb", tower_id))
+            else:
+                self.actions.append(("snipe", tower_id, debris_id))
+        return fired
+
+    def idle_until(self, turn: int):
+        super().idle_until(turn)
+        self.actions.append(("idle_until", turn))
+
+def apply_actions(controller: RobotController, gs: GameState, actions: list):
+    '''
+    Replays actions logged by a RecordingRobotController onto the engine's game state.
+    Each team's towers get ids from their own sequence, so towers built here get the
+    same ids they had where the actions were logged.
+    '''
+    team = controller.get_ally_team()
+    for action in actions:
+        name = action[0]
+        if name == "build_tower":
+            _, tower_type, x, y, logged_id = action
+            controller.build_tower(tower_type, x, y)
+            tower_id = next(reversed(gs.towers[team]))
+            if tower_id != logged_id:
+                raise Exception(f"Bug in game engine. Tower built with id {tower_id}, but it was logged as {logged_id}")
+        elif name == "sell_tower":
+            controller.sell_tower(action[1])
+        elif name == "snipe":
+            controller.snipe(action[1], action[2])
+        elif name == "bomb":
+            controller.bomb(action[1])
+        elif name == "send_debris":
+            controller.send_debris(action[1], action[2])
+        elif name == "idle_until":
+            controller.idle_until(action[1])
+        else:
+            raise Exception(f"Bug in game engine. Unknown action from bot worker: {name}")
+
+def worker_main(conn: Connection, bot_name: str, bot_path: str, map: Map, team: Team):
+    from src.game import import_file
+
+    gs = GameState(map)
+    try:
+        player = import_file(bot_name, bot_path).BotPlayer(copy.deepcopy(map))
+    except:
+        traceback.print_exc()
+        conn.send(False)
+        return
+    conn.send(True)
+
+    while True:
+        message = conn.recv_bytes()
+        if not message:  # Engine asked us to shut down
+            return
+        gs.load_snapshot(pickle.loads(message))
+        controller = RecordingRobotController(team, gs)
+        try:
+            player.play_turn(controller)
+        except Exception:
+            # Same as a crashed player thread: actions taken so far still count
+            traceback.print_exc()
+        conn.send(controller.actions)
+
+class BotWorker:
+    '''
+    Engine-side handle to a bot running in a worker process.
+    '''
+    def __init__(self, bot_name: str, bot_path: str, map: Map, team: Team):
+        self.team = team
+        self.conn, child_conn = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(
+            target=worker_main,
+            args=(child_conn, bot_name, bot_path, map, team),
+            name=f"bot-worker-{team.name.lower()}-{bot_name}",
+            daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+
+    def wait_for_init(self) -> bool:
+        try:
+            return self.conn.recv()
+        except EOFError:
+            return False
+
+    def start_turn(self, snapshot: bytes):
+        self.conn.send_bytes(snapshot)
+
+    def receive_actions(self):
+        '''
+        Returns the actions of the turn, or None if the worker died.
+        '''
+        try:
+            return self.conn.recv()
+        except (EOFError, OSError):
+            return None
+
+    def kill(self):
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+    def close(self):
+        if self.process.is_alive():
+            try:
+                self.conn.send_bytes(b"")
+            except OSError:
+                pass
+            self.process.join(1)
+        self.kill()
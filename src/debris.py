@@ -1,9 +1,11 @@
 from __future__ import annotations
+import copy
+from typing import List
+import numpy as np
 from src.game_constants import Team
+from src.game_exception import GameException
 
 class Debris:
-    id_counter = 0
-
     def __init__(
             self,
             team: Team,
@@ -11,9 +13,10 @@ class Debris:
             y: int,
             cooldown: int,
             health: int,
-            sent_by_opponent: bool
+            sent_by_opponent: bool,
+            id: int
     ) -> None:
-        self.id = self.increment()
+        self.id = id
         self.team = team
         self.progress = 0
         self.x = x
@@ -23,9 +26,244 @@ class Debris:
         self.total_health = health
         self.health = health
         self.sent_by_opponent = sent_by_opponent
-    
-    @staticmethod
-    def increment() -> int:
-        res = Debris.id_counter
-        Debris.id_counter += 1
-        return res
+
+
+class DebrisTable:
+    '''
+    All debris of one team, stored as parallel NumPy columns with one row per
+    debris. Rows are kept in spawn order, which is also increasing id order, so
+    a debris is found by binary search on the id column.
+
+    Behaves like a read-only dict from debris id to Debris; the Debris objects
+    are built from the columns when asked for and changing them has no effect.
+    '''
+    def __init__(self, team: Team, path: list):
+        self.team = team
+        self.path_length = len(path)
+        self.path_x = np.array([x for x, y in path], dtype=np.int64)
+        self.path_y = np.array([y for x, y in path], dtype=np.int64)
+
+        self.id = np.zeros(0, dtype=np.int64)
+        self.progress = np.zeros(0, dtype=np.int64)
+        self.current_cooldown = np.zeros(0, dtype=np.int64)
+        self.total_cooldown = np.zeros(0, dtype=np.int64)
+        self.health = np.zeros(0, dtype=np.float64)
+        self.total_health = np.zeros(0, dtype=np.float64)
+        self.int_health = np.zeros(0, dtype=bool)  # health was spawned as an int, not a float
+        self.sent_by_opponent = np.zeros(0, dtype=bool)
+
+        # Debris objects for every row, built on first use and dropped on any change
+        self.all_rows = None
+
+    def __len__(self) -> int:
+        return len(self.id)
+
+    def __contains__(self, debris_id: int) -> bool:
+        return self.find(debris_id) >= 0
+
+    def __getitem__(self, debris_id: int) -> Debris:
+        row = self.find(debris_id)
+        if row < 0:
+            raise KeyError(debris_id)
+        return self.get_rows([row])[0]
+
+    def __iter__(self):
+        return iter(self.id.tolist())
+
+    def keys(self) -> List[int]:
+        return self.id.tolist()
+
+    def values(self) -> List[Debris]:
+        if self.all_rows is None:
+            self.all_rows = self.get_rows(slice(None))
+        return list(self.all_rows)
+
+    def find(self, debris_id: int) -> int:
+        '''
+        Returns the row of the debris with this id, or -1 if there is none.
+        '''
+        row = int(np.searchsorted(self.id, debris_id))
+        if row < len(self.id) and self.id[row] == debris_id:
+            return row
+        return -1
+
+    def get_x(self, rows) -> np.ndarray:
+        return self.path_x[self.progress[rows]]
+
+    def get_y(self, rows) -> np.ndarray:
+        return self.path_y[self.progress[rows]]
+
+    def get_rows(self, rows) -> List[Debris]:
+        '''
+        Builds Debris objects for the given rows (indices, mask or slice), in row order.
+        '''
+        columns = zip(
+            self.id[rows].tolist(),
+            self.progress[rows].tolist(),
+            self.get_x(rows).tolist(),
+            self.get_y(rows).tolist(),
+            self.current_cooldown[rows].tolist(),
+            self.total_cooldown[rows].tolist(),
+            self.health[rows].tolist(),
+            self.total_health[rows].tolist(),
+            self.int_health[rows].tolist(),
+            self.sent_by_opponent[rows].tolist()
+        )
+        debris = []
+        for id, progress, x, y, current_cooldown, total_cooldown, health, total_health, int_health, sent_by_opponent in columns:
+            if int_health:
+                health, total_health = int(health), int(total_health)
+            deb = Debris(self.team, x, y, total_cooldown, total_health, sent_by_opponent, id)
+            deb.progress = progress
+            deb.current_cooldown = current_cooldown
+            deb.health = health
+            debris.append(deb)
+        return debris
+
+    def copy(self) -> DebrisTable:
+        table = copy.copy(self)  # shares the path, which never changes
+        table.id = self.id.copy()
+        table.progress = self.progress.copy()
+        table.current_cooldown = self.current_cooldown.copy()
+        table.total_cooldown = self.total_cooldown.copy()
+        table.health = self.health.copy()
+        table.total_health = self.total_health.copy()
+        table.int_health = self.int_health.copy()
+        table.sent_by_opponent = self.sent_by_opponent.copy()
+        return table
+
+    def spawn(self, debris_id: int, cooldown: int, health: int, sent_by_opponent: bool):
+        self.all_rows = None
+        self.id = np.append(self.id, debris_id)
+        self.progress = np.append(self.progress, 0)
+        self.current_cooldown = np.append(self.current_cooldown, cooldown)
+        self.total_cooldown = np.append(self.total_cooldown, cooldown)
+        self.health = np.append(self.health, health)
+        self.total_health = np.append(self.total_health, health)
+        self.int_health = np.append(self.int_health, isinstance(health, int))
+        self.sent_by_opponent = np.append(self.sent_by_opponent, sent_by_opponent)
+
+    def keep(self, mask: np.ndarray):
+        '''
+        Removes every row where mask is False.
+        '''
+        self.all_rows = None
+        self.id = self.id[mask]
+        self.progress = self.progress[mask]
+        self.current_cooldown = self.current_cooldown[mask]
+        self.total_cooldown = self.total_cooldown[mask]
+        self.health = self.health[mask]
+        self.total_health = self.total_health[mask]
+        self.int_health = self.int_health[mask]
+        self.sent_by_opponent = self.sent_by_opponent[mask]
+
+    def decrement_cooldowns(self):
+        self.all_rows = None
+        np.maximum(self.current_cooldown - 1, 0, out=self.current_cooldown)
+
+    def advance(self) -> list:
+        '''
+        Moves every debris whose cooldown is over one tile along the path.
+        Debris that reach the end are removed; returns their total health, in spawn order.
+        '''
+        self.all_rows = None
+        ready = self.current_cooldown == 0
+        self.current_cooldown[ready] = self.total_cooldown[ready]
+        self.progress[ready] += 1
+
+        leaked = self.progress == self.path_length
+        if not leaked.any():
+            return []
+        leaked_health = [
+            int(health) if int_health else health
+            for health, int_health in zip(self.total_health[leaked].tolist(), self.int_health[leaked].tolist())
+        ]
+        self.keep(~leaked)
+        return leaked_health
+
+    def damage(self, rows, damage: int):
+        '''
+        Deals damage to the given rows and removes the debris that die.
+        '''
+        self.all_rows = None
+        self.health[rows] -= damage
+        if (self.health[rows] <= 0).any():
+            self.keep(self.health > 0)
+
+    def update_health(self, health: np.ndarray):
+        '''
+        Replaces the health column and removes the debris that died.
+        '''
+        self.all_rows = None
+        self.health = health
+        if (health <= 0).any():
+            self.keep(health > 0)
+
+    def get_rows_on_path(self, path_mask: np.ndarray) -> np.ndarray:
+        '''
+        Returns the rows of debris whose path index is True in path_mask.
+        '''
+        return path_mask[self.progress].nonzero()[0]
+
+class DebrisView:
+    '''
+    Read-only view of a Debris handed to players instead of a deep copy.
+    Attributes reflect the debris at the time it was returned.
+    '''
+    __slots__ = ('_debris',)
+
+    def __init__(self, debris: Debris):
+        object.__setattr__(self, '_debris', debris)
+
+    @property
+    def id(self) -> int:
+        return self._debris.id
+
+    @property
+    def team(self) -> Team:
+        return self._debris.team
+
+    @property
+    def progress(self) -> int:
+        return self._debris.progress
+
+    @property
+    def x(self) -> int:
+        return self._debris.x
+
+    @property
+    def y(self) -> int:
+        return self._debris.y
+
+    @property
+    def total_cooldown(self) -> int:
+        return self._debris.total_cooldown
+
+    @property
+    def current_cooldown(self) -> int:
+        return self._debris.current_cooldown
+
+    @property
+    def total_health(self) -> int:
+        return self._debris.total_health
+
+    @property
+    def health(self) -> int:
+        return self._debris.health
+
+    @property
+    def sent_by_opponent(self) -> bool:
+        return self._debris.sent_by_opponent
+
+    def __setattr__(self, name, value):
+        raise GameException("Debris returned by RobotController is read-only")
+
+    def __delattr__(self, name):
+        raise GameException("Debris returned by RobotController is read-only")
+
+    def __deepcopy__(self, memo):
+        # Deep copying a view gives the player their own mutable snapshot
+        return copy.deepcopy(self._debris, memo)
+
+    def __repr__(self) -> str:
+        return f"DebrisView(id={self.id}, team={self.team}, x={self.x}, y={self.y}, health={self.health})"
@@ -0,0 +1,94 @@
+# The natural debris schedule, precomputed so it can be queried ahead of time
+# get_debris_schedule is evaluated once per turn and stored. Prefix sums over the
+# stored turns answer "how much debris spawns in [start, end)" in constant time.
+# The schedule never ends (debris keeps getting stronger after turn 3700), so the
+# timeline is extended whenever a query reaches past the turns computed so far.
+# The schedule is the same in every game, so every game in a process shares
+# SHARED_TIMELINE rather than building its own.
+
+import threading
+from typing import Optional, Tuple
+import numpy as np
+from src.game_constants import get_debris_schedule
+
+class DebrisTimeline:
+    '''
+    The (cooldown, health) of the natural debris spawned on every turn, per team.
+    '''
+    def __init__(self, initial_turns=4000):
+        self.spawns = []  # (cooldown, health) or None, indexed by turn
+        self.healths = np.zeros(0, dtype=np.float64)  # health spawned on each turn, -inf if none
+        self.count_prefix = np.zeros(1, dtype=np.int64)  # spawns in turns [0, t)
+        self.health_prefix = np.zeros(1, dtype=np.float64)  # total health spawned in turns [0, t)
+        # Bots that ran out of time keep running in their threads and may still query it
+        self.lock = threading.Lock()
+        self.extend(initial_turns)
+
+    def __len__(self) -> int:
+        return len(self.spawns)
+
+    def extend(self, end: int):
+        '''
+        Computes the schedule up to (not including) turn end.
+        '''
+        with self.lock:
+            start = len(self.spawns)
+            if end <= start:
+                return
+            spawns = [get_debris_schedule(turn) for turn in range(start, end)]
+            counts = np.array([spawn is not None for spawn in spawns], dtype=np.int64)
+            healths = np.array([spawn[1] if spawn is not None else -np.inf for spawn in spawns], dtype=np.float64)
+            # The arrays are replaced before the spawns grow, so a query that sees the new length finds them
+            self.healths = np.concatenate([self.healths, healths])
+            self.count_prefix = np.concatenate([self.count_prefix, self.count_prefix[-1] + np.cumsum(counts)])
+            self.health_prefix = np.concatenate([self.health_prefix, self.health_prefix[-1] + np.cumsum(np.maximum(healths, 0))])
+            self.spawns.extend(spawns)
+
+    def ensure(self, turn: int):
+        # Grow by at least doubling so repeated queries past the end stay cheap
+        if turn >= len(self.spawns):
+            self.extend(max(turn + 1, 2 * len(self.spawns)))
+
+    def get(self, turn: int) -> Optional[Tuple[int, int]]:
+        '''
+        Returns the debris spawned on this turn as (cooldown, health), or None. Same as get_debris_schedule.
+        '''
+        if turn < 0:
+            return None
+        self.ensure(turn)
+        return self.spawns[turn]
+
+    def count_between(self, start: int, end: int) -> int:
+        '''
+        Returns how many debris spawn in turns [start, end).
+        '''
+        start, end = max(0, start), max(0, end)
+        if end <= start:
+            return 0
+        self.ensure(end)
+        return int(self.count_prefix[end] - self.count_prefix[start])
+
+    def health_between(self, start: int, end: int) -> float:
+        '''
+        Returns the total health of the debris spawned in turns [start, end).
+        '''
+        start, end = max(0, start), max(0, end)
+        if end <= start:
+            return 0
+        self.ensure(end)
+        return float(self.health_prefix[end] - self.health_prefix[start])
+
+    def get_next(self, turn: int, min_health=0) -> int:
+        '''
+        Returns the first turn at or after this one that spawns debris with at least
+        min_health health. Debris after turn 3700 grows without bound, so there always is one.
+        '''
+        turn = max(0, turn)
+        while True:
+            self.ensure(turn)
+            found = np.flatnonzero(self.healths[turn:] >= min_health)
+            if len(found) > 0:
+                return turn + int(found[0])
+            turn = len(self.spawns)
+
+SHARED_TIMELINE = DebrisTimeline()
@@ -1,19 +1,24 @@
 # Execute the actual game, starts the game and keep tracks of everything
 # Import all other classes
 
-import copy
 import importlib.util
+import pickle
 import random
 import sys
 import os
 from src.game_state import GameState
 from src.robot_controller import RobotController
-from src.game_constants import Team, GameConstants, TowerType, get_debris_schedule
+from src.game_constants import Team
+from src.game_exception import GameException
 from src.player import Player
 from src.map import Map
 from src.replay import Replay
+from src.bot_worker import BotWorker, RecordingRobotController, apply_actions
+from src.phase_timer import PhaseTimer
+from multiprocessing.connection import wait
 from threading import Thread
 import time
+import traceback
 
 def import_file(module_name, file_path):
     spec = importlib.util.spec_from_file_location(module_name, file_path)
@@ -23,21 +28,71 @@ def import_file(module_name, file_path):
     return module
 
 class Game:
-    def __init__(self, blue_path: str, red_path: str, map_path: str, output_replay=False, render=False):
+    def __init__(self, blue_path: str, red_path: str, map_path: str, output_replay=False, render=False, use_workers=False,
+                 replay_dir="replays", replay_format="json", seed=None, timing=False, timing_dir="timing", render_fps=30,
+                 training=False, check_types=True):
+        # Training mode plays games as fast as possible: bots are called directly with no
+        # time limit, and nothing is recorded or drawn
+        self.training = training
+        if training:
+            if use_workers:
+                raise Exception("Training mode runs the bots in this process, so it can't use workers")
+            output_replay = False
+            render = False
+        self.play_seconds = None  # how long the turns of the game took to play, once it's over
+
         self.output_replay = output_replay
         self.render = render
+        self.render_fps = render_fps  # turns in between frames are played but not drawn
+        self.use_workers = use_workers
+
+        # All randomness in the engine comes from this game's own generator, so a game
+        # can be reproduced from its seed and games in one process don't affect each other
+        self.seed = seed if seed is not None else random.randrange(2**32)
+        self.random = random.Random(self.seed)
 
         # initialize map
+        # Each bot gets its own Map loaded from the compiled cache, which is cheaper than a deep copy
+        self.map_path = map_path
         self.map = Map(map_path)
 
         # initialize game_state
         self.gs = GameState(self.map)
 
+        # Phase timing is off unless asked for (see phase_timer)
+        self.timer = PhaseTimer() if timing else None
+        self.timing_dir = timing_dir
+        self.gs.timer = self.timer
+
         # initialize players
+        if self.use_workers:
+            blue_bot_name, red_bot_name = self.start_workers(blue_path, red_path)
+        else:
+            blue_bot_name, red_bot_name = self.load_players(blue_path, red_path)
+
+        # initialize replay
+        self.game_name = f"{blue_bot_name}-{red_bot_name}-{self.map.name}"
+        self.replay = Replay(
+            self.game_name,
+            self.map,
+            blue_bot_name,
+            red_bot_name,
+            output_dir=replay_dir,
+            format=replay_format if output_replay else "none",
+            seed=self.seed
+        )
+
+        # initialize controllers
+        # Action log replays need to know what each bot did, so its controller keeps a log
+        controller_class = RecordingRobotController if self.replay.records_actions else RobotController
+        self.blue_controller = controller_class(Team.BLUE, self.gs, check_types=check_types)
+        self.red_controller = controller_class(Team.RED, self.gs, check_types=check_types)
+
+    def load_players(self, blue_path: str, red_path: str):
         self.blue_failed_init = False
         try:
             blue_bot_name = os.path.basename(blue_path).split(".")[0]
-            self.blue_player: Player = import_file(blue_bot_name, blue_path).BotPlayer(copy.deepcopy(self.map))
+            self.blue_player: Player = import_file(blue_bot_name, blue_path).BotPlayer(Map(self.map_path))
         except:
             blue_bot_name = "blue"
             self.blue_failed_init = True
@@ -45,79 +100,53 @@ class Game:
         self.red_failed_init = False
         try:
             red_bot_name = os.path.basename(red_path).split(".")[0]
-            self.red_player: Player = import_file(red_bot_name, red_path).BotPlayer(copy.deepcopy(self.map))
+            self.red_player: Player = import_file(red_bot_name, red_path).BotPlayer(Map(self.map_path))
         except:
             red_bot_name = "red"
             self.red_failed_init = True
 
-        # initialize replay
-        self.game_name = f"{blue_bot_name}-{red_bot_name}-{self.map.name}"
-        self.replay = Replay(
-            self.game_name,
-            self.map,
-            blue_bot_name,
-            red_bot_name
-        )
+        return blue_bot_name, red_bot_name
 
-        # initialize controllers
-        self.blue_controller = RobotController(Team.BLUE, self.gs)
-        self.red_controller = RobotController(Team.RED, self.gs)
+    def start_workers(self, blue_path: str, red_path: str):
+        # Each bot gets its own long-lived process; both initialize concurrently
+        blue_bot_name = os.path.basename(blue_path).split(".")[0]
+        red_bot_name = os.path.basename(red_path).split(".")[0]
+        self.workers = {
+            Team.BLUE: BotWorker(blue_bot_name, blue_path, self.map, Team.BLUE),
+            Team.RED: BotWorker(red_bot_name, red_path, self.map, Team.RED)
+        }
+        self.blue_failed_init = not self.workers[Team.BLUE].wait_for_init()
+        self.red_failed_init = not self.workers[Team.RED].wait_for_init()
+        if self.blue_failed_init:
+            blue_bot_name = "blue"
+        if self.red_failed_init:
+            red_bot_name = "red"
+        return blue_bot_name, red_bot_name
+
+    def close_workers(self):
+        if self.use_workers:
+            for worker in self.workers.values():
+                worker.close()
         
     def run_turn(self):
-        self.gs.start_turn()
-
-        # Spawn natural debris
-        debris = get_debris_schedule(self.gs.turn)
-        if debris is not None:
-            cooldown, health = debris
-            self.gs.spawn_debris(Team.BLUE, cooldown, health, False)
-            self.gs.spawn_debris(Team.RED, cooldown, health, False)
-
-        # Spawn debris sent by players in previous turn
-        if self.gs.sent_debris[Team.BLUE] is not None:
-            cooldown, health = self.gs.sent_debris[Team.BLUE]
-            self.gs.spawn_debris(Team.RED, cooldown, health, True)
-            self.gs.sent_debris[Team.BLUE] = None
-        if self.gs.sent_debris[Team.RED] is not None:
-            cooldown, health = self.gs.sent_debris[Team.RED]
-            self.gs.spawn_debris(Team.BLUE, cooldown, health, True)
-            self.gs.sent_debris[Team.RED] = None
-
-        # Generate passive income for each player
-        self.gs.balance[Team.BLUE] += GameConstants.PASSIVE_INCOME
-        self.gs.balance[Team.RED] += GameConstants.PASSIVE_INCOME
-
-        # Decrement all debris/tower cooldowns
-        all_debris = list(self.gs.debris[Team.BLUE].values()) + list(self.gs.debris[Team.RED].values())
-        for debris in all_debris:
-            debris.current_cooldown = max(0, debris.current_cooldown - 1)
-        all_towers = list(self.gs.towers[Team.BLUE].values()) + list(self.gs.towers[Team.RED].values())
-        for tower in all_towers:
-            reduction = self.gs.get_tower_cooldown_reduction(tower.team, tower.id)
-            tower.current_cooldown = max(0, tower.current_cooldown - reduction)
-
-        # Advance all debris
-        self.gs.advance_debris()
-
-        # Check if game is over
-        if self.gs.health[Team.BLUE] == 0 or self.gs.health[Team.RED] == 0:
+        if self.gs.advance_turn():
             return self.calculate_winner()
-        
-        # Add time to each player
-        self.gs.time_remaining[Team.BLUE] += GameConstants.ADDITIONAL_TIME_PER_TURN
-        self.gs.time_remaining[Team.RED] += GameConstants.ADDITIONAL_TIME_PER_TURN
-
-        # Farms generate income
-        for team in [Team.BLUE, Team.RED]:
-            for tower in self.gs.towers[team].values():
-                if tower.type == TowerType.SOLAR_FARM:
-                    if tower.current_cooldown == 0:
-                        self.gs.balance[team] += GameConstants.FARM_INCOME
-                        tower.current_cooldown = TowerType.SOLAR_FARM.cooldown
-
-        # Call each player's play_turn
-        blue_success = self.call_player_code(Team.BLUE)
-        red_success = self.call_player_code(Team.RED)
+
+        timer = self.timer
+        if timer:
+            start = time.perf_counter_ns()
+
+        # Call each player's play_turn, skipping bots that asked to idle
+        idle = {team: self.gs.is_idle(team) for team in Team}
+        if self.use_workers:
+            blue_success, red_success = self.call_player_workers(idle)
+        else:
+            blue_success = idle[Team.BLUE] or self.call_player_code(Team.BLUE)
+            red_success = idle[Team.RED] or self.call_player_code(Team.RED)
+        for team in Team:
+            self.gs.watch_idle(team)
+        if timer:
+            timer.record("players", self.gs.turn, start)
 
         if not blue_success and not blue_success:  # Both failed
             return self.calculate_winner()
@@ -132,14 +161,24 @@ class Game:
         player = self.blue_player if team == Team.BLUE else self.red_player
         controller = self.blue_controller if team == Team.BLUE else self.red_controller
 
-        # Create a thread that runs player.play_turn.
         # This function might not exist if the player code is broken, so we need to handle that.
         try:
-            thread = Thread(target=player.play_turn, args=[controller], daemon=True)
+            play_turn = player.play_turn
         except:
             print(f"Failed to call player code for {team}. Are you inheriting the Player class?")
             return False
 
+        if self.training:
+            # No time limit, so no thread; errors end the bot's turn as they would in its thread
+            try:
+                play_turn(controller)
+            except Exception:
+                traceback.print_exc()
+            return True
+
+        # Create a thread that runs player.play_turn.
+        thread = Thread(target=play_turn, args=[controller], daemon=True)
+
         # Run in separate thread with time limit
         funcTime = time.time()
         thread.start()
@@ -154,44 +193,118 @@ class Game:
         self.gs.time_remaining[team] -= funcTime
         return True
     
-    def calculate_winner(self):
-        # Check if one team has more health than the other
-        if self.gs.health[Team.BLUE] != self.gs.health[Team.RED]:
-            if self.gs.health[Team.BLUE] < self.gs.health[Team.RED]:  # more health wins
-                return Team.RED
-            else:
-                return Team.BLUE
-
-        # Break ties by total balance + tower costs
-        values = {Team.BLUE: self.gs.balance[Team.BLUE], Team.RED: self.gs.balance[Team.RED]}
+    def call_player_workers(self, idle: dict):
+        # Both workers play from the same turn-start snapshot at the same time
+        results = {team: (0, []) for team in Team if idle[team]}
+        pending = {self.workers[team].conn: team for team in Team if not idle[team]}
+        snapshot = pickle.dumps(self.gs.get_snapshot()) if pending else None
+        start = time.time()
+        for team in pending.values():
+            self.workers[team].start_turn(snapshot)
+
+        while pending:
+            deadline = min(start + self.gs.time_remaining[team] for team in pending.values())
+            ready = wait(list(pending), max(0, deadline - time.time()))
+            funcTime = time.time() - start
+            for conn in ready:
+                team = pending.pop(conn)
+                results[team] = (funcTime, self.workers[team].receive_actions())
+
+            # Kill workers that ran out of time
+            for conn, team in list(pending.items()):
+                if funcTime >= self.gs.time_remaining[team]:
+                    del pending[conn]
+                    self.workers[team].kill()
+                    results[team] = (funcTime, None)
+
+        # Apply queued actions in the usual blue-then-red order
+        success = {}
         for team in Team:
-            for tower in self.gs.towers[team].values():
-                values[team] += tower.type.cost
-        if values[Team.BLUE] != values[Team.RED]:
-            if values[Team.BLUE] < values[Team.RED]:
-                return Team.RED
-            else:
-                return Team.BLUE
-        
-        # Winner is decided by coin flip
-        return random.choice([Team.BLUE, Team.RED])
+            funcTime, actions = results[team]
+            if actions is None or funcTime > self.gs.time_remaining[team]:
+                self.gs.time_remaining[team] = 0
+                success[team] = False
+                continue
+            self.gs.time_remaining[team] -= funcTime
+            controller = self.blue_controller if team == Team.BLUE else self.red_controller
+            try:
+                apply_actions(controller, self.gs, actions)
+            except GameException:
+                # Same as a bot raising in its thread: the actions before it still count
+                traceback.print_exc()
+            success[team] = True
+        return success[Team.BLUE], success[Team.RED]
+
+    def take_actions(self):
+        # Each team's actions since the last call, if the controllers are keeping a log
+        if not self.replay.records_actions:
+            return None
+        actions = {}
+        for team, controller in [(Team.BLUE, self.blue_controller), (Team.RED, self.red_controller)]:
+            actions[team] = controller.actions
+            controller.actions = []
+        return actions
+
+    def calculate_winner(self):
+        return self.gs.calculate_winner(self.random)
     
     def run_game(self):
-        # Check if we initialized successfully
+        # Check if we initialized successfully; if not, no turns are played
         if self.blue_failed_init:
             print("Blue failed to initialize. Red wins.")
+            self.close_workers()
+            self.play_seconds = 0
             return Team.RED
         elif self.red_failed_init:
             print("Red failed to initialize. Blue wins.")
+            self.close_workers()
+            self.play_seconds = 0
             return Team.BLUE
 
         # Both players initialized successfully; we can start the game
-        while(True):
-            if self.render:
-                self.gs.render()
+        if self.training:
+            return self.run_training_game()
+        # Kept apart from start, which the phase timing reuses for every phase
+        game_start = time.perf_counter()
+        try:
+            while(True):
+                timer = self.timer
+                if timer:
+                    turn_start = start = time.perf_counter_ns()
+                if self.render:
+                    self.gs.render(self.render_fps)
+                    if timer:
+                        timer.record("render", self.gs.turn, start)
+                winner = self.run_turn()
+                if timer:
+                    start = time.perf_counter_ns()
+                self.replay.add_turn(self.gs, self.take_actions())
+                if timer:
+                    timer.record("replay", self.gs.turn, start)
+                    timer.record("turn", self.gs.turn, turn_start)
+                if winner is not None:
+                    if self.render:
+                        self.gs.render(force=True)
+                    self.replay.set_winner(winner)
+                    self.replay.close()
+                    if timer:
+                        timer.export(self.timing_dir, f"{self.game_name}-{self.seed}")
+                    self.play_seconds = time.perf_counter() - game_start
+                    return winner
+        finally:
+            self.close_workers()
+
+    def run_training_game(self):
+        # Only the turns themselves: no rendering, replay or timing of whole turns
+        start = time.perf_counter()
+        winner = None
+        while winner is None:
             winner = self.run_turn()
-            self.replay.add_turn(self.gs)
-            if winner is not None:
-                self.replay.set_winner(winner)
-                self.replay.write_json()
-                return winner
+        self.play_seconds = time.perf_counter() - start
+        return winner
+
+    def get_turns_per_sec(self) -> float:
+        '''
+        Returns how many turns per second the game played at, once it's over.
+        '''
+        return self.gs.turn / self.play_seconds if self.play_seconds else 0
@@ -1,228 +1,385 @@
 from __future__ import annotations
+import copy
 import math
+import random
+import time
+from typing import Optional
 
 import os
 os.environ['PYGAME_HIDE_SUPPORT_PROMPT'] = "hide"
-from src.game_constants import GameConstants, Team, Tile, TowerType
-from src.map import Map
-from src.debris import Debris
+import numpy as np
+from src.game_constants import GameConstants, Team, TowerType
+from src.map import Map, MapView
+from src.debris import DebrisTable
+from src.debris_timeline import SHARED_TIMELINE
+from src.tower import Tower
 
 class GameState:
     def __init__(self, map: Map):
         self.map = map
         self.towers = {Team.BLUE: {}, Team.RED: {}}
-        self.debris = {Team.BLUE: {}, Team.RED: {}}
+        self.debris = {Team.BLUE: DebrisTable(Team.BLUE, map.path), Team.RED: DebrisTable(Team.RED, map.path)}
         self.time_remaining = {Team.BLUE: GameConstants.INITIAL_TIME_POOL, Team.RED: GameConstants.INITIAL_TIME_POOL}
         self.balance = {Team.BLUE: GameConstants.STARTING_BALANCE, Team.RED: GameConstants.STARTING_BALANCE}
         self.health = {Team.BLUE: GameConstants.STARTING_HEALTH, Team.RED: GameConstants.STARTING_HEALTH}
         self.current_snipes = {Team.BLUE: [], Team.RED: []}
         self.current_bombs = {Team.BLUE: [], Team.RED: []}
         self.turn = 0
-        self.has_rendered = False
+        self.renderer = None  # opened by render()
         self.sent_debris = {Team.BLUE: None, Team.RED: None}
+        self.debris_timeline = SHARED_TIMELINE  # the same for every game; it only ever grows
+        self.map_view = None
+        self.timer = None  # PhaseTimer when the game is timing itself
+
+        # Ids handed to the next tower and debris created in this game. Each team's towers
+        # get ids from their own sequence (blue even, red odd), so a bot playing in a
+        # worker, which only sees its own team's builds, gives them the same ids as the engine
+        self.next_tower_id = {Team.BLUE: 0, Team.RED: 0}
+        self.next_debris_id = 0
+
+        # Turn each team asked not to be called until (see RobotController.idle_until),
+        # and what to watch for to wake it early
+        self.idle_until = {Team.BLUE: None, Team.RED: None}
+        self.idle_watch = {Team.BLUE: None, Team.RED: None}
+
+        # Cache of which path indices are in range of a tile, keyed by (x, y, r2)
+        self.path_x = np.array([x for x, y in self.map.path], dtype=np.int64)
+        self.path_y = np.array([y for x, y in self.map.path], dtype=np.int64)
+        self.path_in_range = {}
+
+        # Per-team tile grids, indexed [x][y], kept in sync by add_tower/remove_tower.
+        # Shared with forks until either side changes them (see own_grids)
+        self.grids_shared = False
+        self.occupied = {
+            Team.BLUE: [[False for y in range(self.map.height)] for x in range(self.map.width)],
+            Team.RED: [[False for y in range(self.map.height)] for x in range(self.map.width)]
+        }
+        self.reinforcer_coverage = {
+            Team.BLUE: [[0 for y in range(self.map.height)] for x in range(self.map.width)],
+            Team.RED: [[0 for y in range(self.map.height)] for x in range(self.map.width)]
+        }
+
+    def get_map_view(self) -> MapView:
+        # Built once and shared, since the map never changes
+        if self.map_view is None:
+            self.map_view = MapView(self.map)
+        return self.map_view
+
+    def allocate_tower_id(self, team: Team) -> int:
+        tower_id = 2 * self.next_tower_id[team] + team.value
+        self.next_tower_id[team] += 1
+        return tower_id
+
+    def allocate_debris_id(self) -> int:
+        debris_id = self.next_debris_id
+        self.next_debris_id += 1
+        return debris_id
+
+    def fork(self) -> GameState:
+        '''
+        Returns a copy of this state that can be played forward without changing this one.
+        The map and caches are shared, and so are the tower grids until either state
+        builds or sells a tower.
+        '''
+        fork = copy.copy(self)
+        fork.towers = {team: {tower_id: copy.copy(tower) for tower_id, tower in self.towers[team].items()} for team in Team}
+        fork.debris = {team: self.debris[team].copy() for team in Team}
+        fork.time_remaining = dict(self.time_remaining)
+        fork.balance = dict(self.balance)
+        fork.health = dict(self.health)
+        fork.current_snipes = {team: list(self.current_snipes[team]) for team in Team}
+        fork.current_bombs = {team: list(self.current_bombs[team]) for team in Team}
+        fork.sent_debris = dict(self.sent_debris)
+        fork.next_tower_id = dict(self.next_tower_id)
+        fork.idle_until = dict(self.idle_until)
+        fork.idle_watch = {team: dict(watch) if watch is not None else None for team, watch in self.idle_watch.items()}
+        fork.timer = None
+        fork.renderer = None
+        self.grids_shared = True
+        fork.grids_shared = True
+        return fork
+
+    def own_grids(self):
+        # Copies the tower grids before changing them if they are shared with a fork
+        if not self.grids_shared:
+            return
+        self.occupied = {team: [col[:] for col in self.occupied[team]] for team in Team}
+        self.reinforcer_coverage = {team: [col[:] for col in self.reinforcer_coverage[team]] for team in Team}
+        self.grids_shared = False
+
+    def advance_turn(self) -> bool:
+        '''
+        Plays the part of a turn that doesn't involve the players: spawning debris,
+        income, cooldowns and moving debris. Returns True if a team ran out of health,
+        which ends the game before the players are called.
+        '''
+        self.start_turn()
+        timer = self.timer
+        if timer:
+            start = time.perf_counter_ns()
+
+        # Spawn natural debris
+        debris = self.debris_timeline.get(self.turn)
+        if debris is not None:
+            cooldown, health = debris
+            self.spawn_debris(Team.BLUE, cooldown, health, False)
+            self.spawn_debris(Team.RED, cooldown, health, False)
+
+        # Spawn debris sent by players in previous turn
+        if self.sent_debris[Team.BLUE] is not None:
+            cooldown, health = self.sent_debris[Team.BLUE]
+            self.spawn_debris(Team.RED, cooldown, health, True)
+            self.sent_debris[Team.BLUE] = None
+        if self.sent_debris[Team.RED] is not None:
+            cooldown, health = self.sent_debris[Team.RED]
+            self.spawn_debris(Team.BLUE, cooldown, health, True)
+            self.sent_debris[Team.RED] = None
+        if timer:
+            start = timer.record("spawn_debris", self.turn, start)
+
+        # Generate passive income for each player
+        self.balance[Team.BLUE] += GameConstants.PASSIVE_INCOME
+        self.balance[Team.RED] += GameConstants.PASSIVE_INCOME
+        if timer:
+            start = timer.record("passive_income", self.turn, start)
+
+        # Decrement all debris/tower cooldowns
+        self.decrement_debris_cooldowns()
+        all_towers = list(self.towers[Team.BLUE].values()) + list(self.towers[Team.RED].values())
+        for tower in all_towers:
+            reduction = self.get_tower_cooldown_reduction(tower.team, tower.id)
+            tower.current_cooldown = max(0, tower.current_cooldown - reduction)
+        if timer:
+            start = timer.record("cooldowns", self.turn, start)
+
+        # Advance all debris
+        self.advance_debris()
+        if timer:
+            start = timer.record("advance_debris", self.turn, start)
+
+        # Check if game is over
+        if self.health[Team.BLUE] == 0 or self.health[Team.RED] == 0:
+            return True
+
+        # Add time to each player
+        self.time_remaining[Team.BLUE] += GameConstants.ADDITIONAL_TIME_PER_TURN
+        self.time_remaining[Team.RED] += GameConstants.ADDITIONAL_TIME_PER_TURN
+
+        # Farms generate income
+        for team in [Team.BLUE, Team.RED]:
+            for tower in self.towers[team].values():
+                if tower.type == TowerType.SOLAR_FARM:
+                    if tower.current_cooldown == 0:
+                        self.balance[team] += GameConstants.FARM_INCOME
+                        tower.current_cooldown = TowerType.SOLAR_FARM.cooldown
+        if timer:
+            timer.record("farm_income", self.turn, start)
+        return False
 
     def start_turn(self):
         self.current_snipes = {Team.BLUE: [], Team.RED: []}
         self.current_bombs = {Team.BLUE: [], Team.RED: []}
         self.turn += 1
     
+    def get_snapshot(self) -> dict:
+        '''
+        Returns the state that changes from turn to turn, for handing to another process.
+        '''
+        return {
+            "turn": self.turn,
+            "towers": self.towers,
+            "debris": self.debris,
+            "time_remaining": self.time_remaining,
+            "balance": self.balance,
+            "health": self.health,
+            "sent_debris": self.sent_debris,
+            "next_tower_id": self.next_tower_id,
+            "next_debris_id": self.next_debris_id
+        }
+
+    def load_snapshot(self, snapshot: dict):
+        '''
+        Replaces this state with one from get_snapshot() and rebuilds the derived indices.
+        '''
+        self.turn = snapshot["turn"]
+        self.time_remaining = snapshot["time_remaining"]
+        self.balance = snapshot["balance"]
+        self.health = snapshot["health"]
+        self.sent_debris = snapshot["sent_debris"]
+        self.next_tower_id = snapshot["next_tower_id"]
+        self.next_debris_id = snapshot["next_debris_id"]
+        self.current_snipes = {Team.BLUE: [], Team.RED: []}
+        self.current_bombs = {Team.BLUE: [], Team.RED: []}
+
+        self.debris = snapshot["debris"]
+
+        self.towers = {Team.BLUE: {}, Team.RED: {}}
+        self.own_grids()
+        for team in Team:
+            for col in self.occupied[team]:
+                col[:] = [False] * len(col)
+            for col in self.reinforcer_coverage[team]:
+                col[:] = [0] * len(col)
+            for tower in snapshot["towers"][team].values():
+                self.add_tower(tower)
+
     def spawn_debris(self, team: Team, cooldown: int, health: int, sent_by_opponent: bool):
-        loc = self.map.path[0]
-        debris = Debris(team, loc[0], loc[1], cooldown, health, sent_by_opponent)
-        self.debris[team][debris.id] = debris
+        self.debris[team].spawn(self.allocate_debris_id(), cooldown, health, sent_by_opponent)
+
+    def calculate_winner(self, rng: random.Random) -> Team:
+        '''
+        Returns the winner of a game that ended in this state, drawing from rng for a coin flip.
+        '''
+        # Check if one team has more health than the other
+        if self.health[Team.BLUE] != self.health[Team.RED]:
+            if self.health[Team.BLUE] < self.health[Team.RED]:  # more health wins
+                return Team.RED
+            else:
+                return Team.BLUE
+
+        # Break ties by total balance + tower costs
+        values = {Team.BLUE: self.balance[Team.BLUE], Team.RED: self.balance[Team.RED]}
+        for team in Team:
+            for tower in self.towers[team].values():
+                values[team] += tower.type.cost
+        if values[Team.BLUE] != values[Team.RED]:
+            if values[Team.BLUE] < values[Team.RED]:
+                return Team.RED
+            else:
+                return Team.BLUE
+
+        # Winner is decided by coin flip
+        return rng.choice([Team.BLUE, Team.RED])
 
     def is_placeable(self, team: Team, x: int, y: int) -> bool:
         if not self.map.is_space(x, y):
             return False
-        for tower in self.towers[team].values():
-            if (tower.x, tower.y) == (x, y):
-                return False
-        return True
+        return not self.occupied[team][x][y]
+
+    def add_tower(self, tower: Tower):
+        self.own_grids()
+        self.towers[tower.team][tower.id] = tower
+        self.occupied[tower.team][tower.x][tower.y] = True
+        if tower.type == TowerType.REINFORCER:
+            self.update_reinforcer_coverage(tower, 1)
+
+    def remove_tower(self, team: Team, tower_id: int):
+        self.own_grids()
+        tower = self.towers[team].pop(tower_id)
+        self.occupied[team][tower.x][tower.y] = False
+        if tower.type == TowerType.REINFORCER:
+            self.update_reinforcer_coverage(tower, -1)
+
+    def update_reinforcer_coverage(self, reinforcer: Tower, delta: int):
+        coverage = self.reinforcer_coverage[reinforcer.team]
+        r2 = TowerType.REINFORCER.range
+        r = math.isqrt(r2)
+        for x in range(max(0, reinforcer.x - r), min(self.map.width, reinforcer.x + r + 1)):
+            for y in range(max(0, reinforcer.y - r), min(self.map.height, reinforcer.y + r + 1)):
+                if (x - reinforcer.x)**2 + (y - reinforcer.y)**2 <= r2:
+                    coverage[x][y] += delta
     
-    def damage_debris(self, debris_id: int, damage: int):
-        team = None
-        if debris_id in self.debris[Team.BLUE]:
-            team = Team.BLUE
-        elif debris_id in self.debris[Team.RED]:
-            team = Team.RED
-        if team is None:
+    def damage_debris(self, team: Team, debris_id: int, damage: int):
+        row = self.debris[team].find(debris_id)
+        if row < 0:
             raise Exception("Bug in game engine. Tried to damage non-existent debris.")
-        
-        self.debris[team][debris_id].health -= damage
-        if self.debris[team][debris_id].health <= 0:
-            del self.debris[team][debris_id]
+        self.debris[team].damage([row], damage)
+
+    def damage_debris_in_range(self, team: Team, x: int, y: int, r2: int, damage: int):
+        rows = self.get_debris_rows_within_radius_squared(team, x, y, r2)
+        if len(rows) > 0:
+            self.debris[team].damage(rows, damage)
+
+    def decrement_debris_cooldowns(self):
+        for team in Team:
+            self.debris[team].decrement_cooldowns()
     
     def advance_debris(self):
         for team in Team:
-            to_remove = []
-            for debris in self.debris[team].values():
-                if debris.current_cooldown > 0:
-                    continue
-                else:
-                    debris.current_cooldown = debris.total_cooldown
-                    debris.progress += 1
-                    if debris.progress == len(self.map.path):
-                        to_remove.append(debris.id)
-                        self.health[team] -= debris.total_health
-                        self.health[team] = max(0, self.health[team])
-                    else:
-                        debris.x, debris.y = self.map.path[debris.progress]
-            for id in to_remove:
-                del self.debris[team][id]
-    
-    def get_tower_cooldown_reduction(self, team: Team, tower_id: int) -> float:
-        this_tower = self.towers[team][tower_id]
+            for total_health in self.debris[team].advance():
+                self.health[team] -= total_health
+                self.health[team] = max(0, self.health[team])
+
+    def set_idle(self, team: Team, turn: int):
+        self.idle_until[team] = turn
+        self.idle_watch[team] = None
 
-        num_reinforcers = 0
+    def watch_idle(self, team: Team):
+        '''
+        Records what a team that asked to idle this turn can see at the end of the turn,
+        so is_idle can tell when something new happens.
+        '''
+        if self.idle_until[team] is None or self.idle_watch[team] is not None:
+            return
+        covered = np.zeros(self.map.path_length, dtype=bool)
         for tower in self.towers[team].values():
-            if tower.type == TowerType.REINFORCER:
-                dist = (tower.x - this_tower.x)**2 + (tower.y - this_tower.y)**2
-                if dist <= TowerType.REINFORCER.range:
-                    num_reinforcers += 1
-        
-        return GameConstants.REINFORCER_COOLDOWN_MULTIPLIER**num_reinforcers
+            if tower.type in [TowerType.GUNSHIP, TowerType.BOMBER]:
+                covered |= self.get_path_in_range(tower.x, tower.y, tower.type.range)
+        debris = self.debris[team]
+        self.idle_watch[team] = {
+            "covered": covered,
+            "in_range": debris.id[covered[debris.progress]],
+            "last_id": int(debris.id[-1]) if len(debris) > 0 else -1,
+            "health": self.health[team]
+        }
 
-    def render(self):
-        import pygame
-        import pygame.font as font
-
-        if not self.has_rendered:
-            self.has_rendered = True
-            pygame.init()
-            pygame.display.set_caption("GameState visualizer")
-            self.tile_size = 20
-            self.screen = pygame.display.set_mode((self.map.width*2 * self.tile_size, self.map.height * self.tile_size))
-        
-        # For performance
-        pygame.event.get()
-
-        # Function to get screen coordinates of each map tile in the form ((left, top), (width, height))
-        def get_screen_coords(team, x: int, y: int) -> tuple[tuple[int, int], tuple[int, int]]:
-            left = x * self.tile_size
-            if team == Team.RED: # Red is on the right
-                left += self.map.width * self.tile_size
-            top = (self.map.height - 1 - y) * self.tile_size
-            return ((left, top), (self.tile_size, self.tile_size))
-        
-        # Draw tiles of each team (space is black, path is purple, asteroids are gray)
-        space_color = (50, 50, 50)
-        path_color = (128, 0, 128)
-        asteroid_color = (128, 128, 128)
-        for x in range(self.map.width):
-            for y in range(self.map.height):
-                if self.map.tiles[x][y] == Tile.SPACE:
-                    color = space_color
-                elif self.map.tiles[x][y] == Tile.PATH:
-                    color = path_color
-                else:
-                    color = asteroid_color
-
-                # Draw blue team tile
-                pygame.draw.rect(self.screen, color, get_screen_coords(Team.BLUE, x, y))
-
-                # Draw red team tile
-                pygame.draw.rect(self.screen, color, get_screen_coords(Team.RED, x, y))
-        
-        # Draw blue and red towers as circles
-        for team in [Team.BLUE, Team.RED]:
-            for tower in self.towers[team].values():
-                team = tower.team
-                color = (0, 0, 255) if team == Team.BLUE else (255, 0, 0)
-                ((left, top), (width, height)) = get_screen_coords(team, tower.x, tower.y)
-                center = (left + width/2, top + height/2)
+    def is_idle(self, team: Team) -> bool:
+        '''
+        Returns True if the team's bot should not be called this turn. The bot is called
+        again once its idle turn is reached, debris enters range of one of its gunships or
+        bombers, debris leaks, or debris sent by the opponent spawns.
+        '''
+        if self.idle_until[team] is None:
+            return False
+        watch = self.idle_watch[team]
+        debris = self.debris[team]
+        in_range = debris.id[watch["covered"][debris.progress]]
+        if (self.turn >= self.idle_until[team]
+                or self.health[team] < watch["health"]
+                or (debris.sent_by_opponent & (debris.id > watch["last_id"])).any()
+                or not np.isin(in_range, watch["in_range"]).all()):
+            self.set_idle(team, None)
+            return False
+        watch["in_range"] = in_range
+        return True
 
-                if tower.type == TowerType.SOLAR_FARM:
-                    innercolor = (255, 255, 0)
-                elif tower.type == TowerType.BOMBER:
-                    innercolor = (0, 0, 0)
-                elif tower.type == TowerType.GUNSHIP:
-                    innercolor = (0, 204, 204)
-                elif tower.type == TowerType.REINFORCER:
-                    innercolor = (0, 204, 0)
-                else:
-                    innercolor = (255, 51, 153)
-
-                pygame.draw.circle(self.screen, color, center, 6)
-                pygame.draw.circle(self.screen, innercolor, center, 4)
-                
-        
-        # Draw debris as text indicating number of debris on that tile
-        counts = {}
-        counts[Team.BLUE] = [[0 for y in range(self.map.height)] for x in range(self.map.width)]
-        counts[Team.RED] = [[0 for y in range(self.map.height)] for x in range(self.map.width)]
-        for team in [Team.BLUE, Team.RED]:
-            for deb in self.debris[team].values():
-                x = deb.x
-                y = deb.y
-                counts[team][x][y] += 1
-        for team in [Team.BLUE, Team.RED]:
-            for x in range(self.map.width):
-                for y in range(self.map.height):
-                    if counts[team][x][y] == 0:
-                        continue
-                    text = font.SysFont('Comic Sans MS', 10).render(str(counts[team][x][y]), True, (255, 255, 255))
-                    ((left, top), (width, height)) = get_screen_coords(team, x, y)
-                    center = (left + width/2, top + height/2)
-                    text_rect = text.get_rect(center=center)
-                    self.screen.blit(text, text_rect)
-        
-        # Draw line separating blue and red sides
-        pygame.draw.line(
-            self.screen,
-            (255, 255, 255),
-            (self.map.width * self.tile_size, 0),
-            (self.map.width * self.tile_size, self.map.height * self.tile_size)
-        )
-
-        # Draw snipes as line from tower to debris
-        for team in [Team.BLUE, Team.RED]:
-            for ((tower_x, tower_y), (debris_x, debris_y)) in self.current_snipes[team]:
-                tower_coords = get_screen_coords(team, tower_x, tower_y)
-                tower_center = (tower_coords[0][0] + tower_coords[1][0] / 2, tower_coords[0][1] + tower_coords[1][1] / 2)
-                debris_coords = get_screen_coords(team, debris_x, debris_y)
-                debris_center = (debris_coords[0][0] + debris_coords[1][0] / 2, debris_coords[0][1] + debris_coords[1][1] / 2)
-                
-                pygame.draw.line(
-                    self.screen,
-                    (0, 0, 255) if team == Team.BLUE else (255, 0, 0),
-                    tower_center,
-                    debris_center
-                )
-        
-        # Draw sprays as circles
-        for team in [Team.BLUE, Team.RED]:
-            for (x, y) in self.current_bombs[team]:
-                ((left, top), (width, height)) = get_screen_coords(team, x, y)
-                center = (left + width/2, top + height/2)
-
-                pygame.draw.circle(
-                    self.screen,
-                    (0, 0, 0),
-                    center,
-                    math.sqrt(TowerType.BOMBER.range) * self.tile_size,
-                    1 # circle outline width
-                )
-
-        # Draw turn number in bottom left
-        text = font.SysFont('Comic Sans MS', 10).render(f"Turn: {self.turn}", True, (255, 255, 255))
-        self.screen.blit(text, ((2, self.screen.get_height()-20), (self.screen.get_width()//2, 20)))
-
-        # Draw each team's balance
-        text = font.SysFont('Comic Sans MS', 10).render(f"Balance: {self.balance[Team.BLUE]}", True, (255, 255, 255))
-        self.screen.blit(text, ((2, 0), (self.screen.get_width()//2, 20)))
-        text = font.SysFont('Comic Sans MS', 10).render(f"Balance: {self.balance[Team.RED]}", True, (255, 255, 255))
-        self.screen.blit(text, ((self.screen.get_width()//2+2, 0), (self.screen.get_width()//2, 20)))
-
-        # Draw each team's health
-        text = font.SysFont('Comic Sans MS', 10).render(f"Health: {self.health[Team.BLUE]}", True, (255, 255, 255))
-        self.screen.blit(text, ((2, 20), (self.screen.get_width()//2, 40)))
-        text = font.SysFont('Comic Sans MS', 10).render(f"Health: {self.health[Team.RED]}", True, (255, 255, 255))
-        self.screen.blit(text, ((self.screen.get_width()//2+2, 20), (self.screen.get_width()//2, 40)))
-
-        # Draw each team's time remaining
-        text = font.SysFont('Comic Sans MS', 10).render(f"Time: {self.time_remaining[Team.BLUE]: .2f}", True, (255, 255, 255))
-        self.screen.blit(text, ((2, 40), (self.screen.get_width()//2, 60)))
-        text = font.SysFont('Comic Sans MS', 10).render(f"Time: {self.time_remaining[Team.RED]: .2f}", True, (255, 255, 255))
-        self.screen.blit(text, ((self.screen.get_width()//2+2, 40), (self.screen.get_width()//2, 60)))
-
-        pygame.display.update()
+    def get_path_in_range(self, x: int, y: int, r2: int) -> np.ndarray:
+        '''
+        Returns a boolean array over path indices, True where the path tile is within
+        radius squared r2 of (x, y). Computed once per (x, y, r2) and cached, so each
+        tower tile pays for it once.
+        '''
+        key = (x, y, r2)
+        in_range = self.path_in_range.get(key)
+        if in_range is None:
+            in_range = (self.path_x - x)**2 + (self.path_y - y)**2 <= r2
+            self.path_in_range[key] = in_range
+        return in_range
+
+    def get_debris_rows_within_radius_squared(self, team: Team, x: int, y: int, r2: int) -> np.ndarray:
+        '''
+        Returns the rows of self.debris[team] within radius squared r2 of (x, y), in spawn order.
+        '''
+        return self.debris[team].get_rows_on_path(self.get_path_in_range(x, y, r2))
+
+    def get_debris_within_radius_squared(self, team: Team, x: int, y: int, r2: int) -> list:
+        '''
+        Returns the debris of a team within radius squared r2 of (x, y), in spawn order.
+        '''
+        rows = self.get_debris_rows_within_radius_squared(team, x, y, r2)
+        return self.debris[team].get_rows(rows)
+
+    def get_tower_cooldown_reduction(self, team: Team, tower_id: int) -> float:
+        this_tower = self.towers[team][tower_id]
+        num_reinforcers = self.reinforcer_coverage[team][this_tower.x][this_tower.y]
+        return GameConstants.REINFORCER_COOLDOWN_MULTIPLIER**num_reinforcers
+
+    def render(self, fps: Optional[float] = None, skip_frames=True, force=False):
+        '''
+        Draws this state in a pygame window, opened on the first call. See Renderer for fps and skip_frames,
+        which only take effect on the first call.
+        '''
+        if self.renderer is None:
+            from src.renderer import Renderer
+            self.renderer = Renderer(self.map, fps=fps, skip_frames=skip_frames)
+        self.renderer.render(self, force)
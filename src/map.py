@@ -1,33 +1,47 @@
+from functools import cached_property
 from src.game_constants import Tile
+from src.game_exception import GameException
 import os
-import src.map_processor as map_processor
-import ast
+import src.map_cache as map_cache
+
+def get_tiles(tile_array) -> list:
+    tile_types = {tile.value: tile for tile in Tile}
+    return [[tile_types[tile] for tile in col] for col in tile_array.tolist()]
 
 class Map:
     def __init__(self, fname: str):
         self.name = os.path.basename(fname).split('.')[0]
-        with open(fname, 'r') as f:
-            arrAsStr = f.readline()
-
-        self.arr = ast.literal_eval(arrAsStr)
-        self.height = len(self.arr)
-        self.width = len(self.arr[0])
+        compiled = map_cache.load_map(fname)
+        self._compiled = compiled
 
-        self.path = map_processor.get_path(fname)
-        for i in range(len(self.path)):
-            self.path[i] = (self.path[i][1], self.height-1-self.path[i][0]) # swap xs and ys
+        self.height = compiled["height"]
+        self.width = compiled["width"]
 
+        self.path = compiled["path"]
         self.path_length = len(self.path)
-        
-        self.tiles = [[Tile.SPACE for y in range(self.height)] for x in range(self.width)]
-        for i in range(self.path_length):
-            x, y = self.path[i]
-            self.tiles[x][y] = Tile.PATH
-
-        for x in range(self.width):
-            for y in range(self.height):
-                if self.arr[y][x][0] == 'R':
-                    self.tiles[x][self.height-1-y] = Tile.ASTEROID
+
+        # Tile value of every tile and its index in self.path (-1 off the path), indexed
+        # [x, y]. Read-only, since the map never changes
+        self.tile_array = compiled["tiles"]
+        self.path_index_array = compiled["path_index"]
+        self.tile_array.setflags(write=False)
+        self.path_index_array.setflags(write=False)
+
+    # The grids as Python lists are built the first time they are used, since that
+    # takes much longer than loading the map; after that they are plain attributes
+    @cached_property
+    def arr(self) -> list:
+        return map_cache.get_arr(self._compiled)
+
+    @cached_property
+    def tiles(self) -> list:
+        # Tile of every tile, indexed [x][y]
+        return get_tiles(self.tile_array)
+
+    @cached_property
+    def path_index(self) -> list:
+        # Index in self.path of each tile, indexed [x][y]; -1 for tiles off the path
+        return self.path_index_array.tolist()
     
     def is_in_bounds(self, x: int, y: int) -> bool:
         return 0 <= x < self.width and 0 <= y < self.height
@@ -46,4 +60,45 @@ class Map:
         if not self.is_in_bounds(x, y):
             return False
         return self.tiles[x][y] == Tile.PATH
- 
\ No newline at end of file
+
+    def get_path_index(self, x: int, y: int) -> int:
+        '''
+        Returns the index of (x, y) in the path, or -1 if it is not a path tile.
+        '''
+        if not self.is_in_bounds(x, y):
+            return -1
+        return self.path_index[x][y]
+
+
+class MapView(Map):
+    '''
+    Read-only snapshot of a Map handed to players instead of a deep copy.
+    The map never changes during a game, so one view is built up front and shared.
+    '''
+    def __init__(self, map: Map):
+        object.__setattr__(self, 'name', map.name)
+        object.__setattr__(self, '_compiled', map._compiled)
+        object.__setattr__(self, 'height', map.height)
+        object.__setattr__(self, 'width', map.width)
+        object.__setattr__(self, 'path', tuple(tuple(loc) for loc in map.path))
+        object.__setattr__(self, 'path_length', map.path_length)
+        object.__setattr__(self, 'tile_array', map.tile_array)
+        object.__setattr__(self, 'path_index_array', map.path_index_array)
+
+    @cached_property
+    def arr(self) -> tuple:
+        return tuple(tuple(tuple(tile) for tile in row) for row in map_cache.get_arr(self._compiled))
+
+    @cached_property
+    def tiles(self) -> tuple:
+        return tuple(tuple(col) for col in get_tiles(self.tile_array))
+
+    @cached_property
+    def path_index(self) -> tuple:
+        return tuple(tuple(col) for col in self.path_index_array.tolist())
+
+    def __setattr__(self, name, value):
+        raise GameException("The map returned by RobotController is read-only")
+
+    def __delattr__(self, name):
+        raise GameException("The map returned by RobotController is read-only")
@@ -0,0 +1,148 @@
+# Compiled maps, so a map is only parsed the first time it is loaded
+# A .awap24m file is a Python literal that has to be parsed and have its path
+# traced. The result is stored as a small binary file named after the hash of
+# the map's contents, in a .compiled directory next to the map:
+#   header      -> magic, version, width, height, path length
+#   arr         -> the letter of every cell in file order, then its two numbers
+#   path        -> (x, y) of every path tile, in order
+#   tiles       -> Tile value of every tile, indexed [x][y]
+#   path_index  -> index in the path of every tile, indexed [x][y], -1 off the path
+# Editing a map changes its hash, so a stale compiled map is never read.
+# Reading a compiled map leaves the grids as numpy arrays over the decompressed
+# bytes; building Python lists from them for a large map takes far longer than
+# reading it, so Map only does that when the lists are asked for.
+
+import ast
+import hashlib
+import json
+import os
+import struct
+import zlib
+import numpy as np
+from src.game_constants import Tile
+import src.map_processor as map_processor
+
+COMPILED_MAGIC = b"AWMC"
+COMPILED_VERSION = 2
+HEADER = struct.Struct("<4sHHHI")
+
+def get_compiled_path(fname: str, source: bytes) -> str:
+    digest = hashlib.sha256(source).hexdigest()[:32]
+    return os.path.join(os.path.dirname(fname), ".compiled", f"{digest}.awap24mc")
+
+def compile_map(source: bytes) -> dict:
+    '''
+    Parses the contents of a .awap24m file into the arrays a Map is built from.
+    '''
+    line = source.decode().split("\n", 1)[0]
+    try:
+        arr = json.loads(line)  # much faster than literal_eval on large maps
+    except ValueError:
+        arr = ast.literal_eval(line)
+    height = len(arr)
+    width = len(arr[0])
+
+    path = map_processor.get_path_from_array(arr)
+    path = [(c, height-1-r) for r, c in path]  # swap xs and ys
+
+    tiles = np.full((width, height), Tile.SPACE.value, dtype=np.uint8)
+    path_index = np.full((width, height), -1, dtype=np.int32)
+    for i, (x, y) in enumerate(path):
+        tiles[x, y] = Tile.PATH.value
+        path_index[x, y] = i
+    for x in range(width):
+        for y in range(height):
+            if arr[y][x][0] == 'R':
+                tiles[x, height-1-y] = Tile.ASTEROID.value
+
+    return {
+        "arr": arr,
+        "width": width,
+        "height": height,
+        "path": path,
+        "tiles": tiles,
+        "path_index": path_index
+    }
+
+def encode_compiled_map(compiled: dict) -> bytes:
+    arr = compiled["arr"]
+    letters = "".join(cell[0] for row in arr for cell in row).encode()
+    numbers = np.array([cell[1:] for row in arr for cell in row], dtype=np.int32)
+    path = np.array(compiled["path"], dtype=np.int32).reshape(-1, 2)
+    body = b"".join([
+        letters,
+        numbers.tobytes(),
+        path.tobytes(),
+        compiled["tiles"].tobytes(),
+        compiled["path_index"].tobytes()
+    ])
+    header = HEADER.pack(COMPILED_MAGIC, COMPILED_VERSION, compiled["width"], compiled["height"], len(path))
+    return header + zlib.compress(body)
+
+def decode_compiled_map(data: bytes) -> dict:
+    magic, version, width, height, path_length = HEADER.unpack_from(data)
+    if magic != COMPILED_MAGIC or version != COMPILED_VERSION:
+        raise ValueError("Not a compiled map of this version")
+    body = zlib.decompress(data[HEADER.size:])
+
+    num_cells = width * height
+    sizes = [num_cells, num_cells * 8, path_length * 8, num_cells, num_cells * 4]
+    if len(body) != sum(sizes):
+        raise ValueError("Compiled map is truncated")
+    offsets = np.cumsum([0] + sizes).tolist()
+    letters = body[offsets[0]:offsets[1]].decode()
+    numbers = np.frombuffer(body[offsets[1]:offsets[2]], dtype=np.int32).reshape(num_cells, 2)
+    path = np.frombuffer(body[offsets[2]:offsets[3]], dtype=np.int32).reshape(path_length, 2).tolist()
+    tiles = np.frombuffer(body[offsets[3]:offsets[4]], dtype=np.uint8).reshape(width, height)
+    path_index = np.frombuffer(body[offsets[4]:offsets[5]], dtype=np.int32).reshape(width, height)
+
+    return {
+        "letters": letters,
+        "numbers": numbers,
+        "width": width,
+        "height": height,
+        "path": [(x, y) for x, y in path],
+        "tiles": tiles,
+        "path_index": path_index
+    }
+
+def get_arr(compiled: dict) -> list:
+    '''
+    Returns the cells of a compiled map as they are written in its file: a list of
+    rows of [letter, number, number].
+    '''
+    if "arr" in compiled:
+        return compiled["arr"]
+    width, height = compiled["width"], compiled["height"]
+    letters = compiled["letters"]
+    numbers = compiled["numbers"].tolist()
+    return [
+        [[letters[y * width + x]] + numbers[y * width + x] for x in range(width)]
+        for y in range(height)
+    ]
+
+def load_map(fname: str) -> dict:
+    '''
+    Returns the compiled form of a map, reading it from the cache if the map has
+    been compiled before and compiling (and caching) it otherwise.
+    '''
+    with open(fname, "rb") as f:
+        source = f.read()
+    compiled_path = get_compiled_path(fname, source)
+    try:
+        with open(compiled_path, "rb") as f:
+            return decode_compiled_map(f.read())
+    except (OSError, ValueError, struct.error, zlib.error):
+        pass
+
+    compiled = compile_map(source)
+    try:
+        os.makedirs(os.path.dirname(compiled_path), exist_ok=True)
+        # Write to a temporary file first so a concurrent reader never sees half a map
+        temp_path = f"{compiled_path}.{os.getpid()}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(encode_compiled_map(compiled))
+        os.replace(temp_path, compiled_path)
+    except OSError:
+        pass  # read-only location; the map is compiled again next time
+    return compiled
@@ -4,69 +4,63 @@ def print2DArr (bools):
             print(bools[i][j], ' ')
         print('\n')
 
-# true if x, y is a valid start / end point (e.g. only has one path block touching it)
-def isPoint (arr, x, y, n, m):
-    numSurrounding = 0
-    if (x-1 > 0 and arr[x-1][y][0] == 'P'):
-        numSurrounding+=1
-    if (y-1 > 0 and arr[x][y-1][0] == 'P'):
-        numSurrounding+=1
-    if (x+1 < n and arr[x+1][y][0] == 'P'):
-        numSurrounding+=1
-    if (y+1 < m and arr[x][y+1][0] == 'P'):
-        numSurrounding+=1
+# offsets of the tiles next to a tile, in the order a path is followed when a tile has a choice
+NEIGHBOURS = [(1, 0), (0, -1), (-1, 0), (0, 1)]
 
-    return (arr[x][y][0] == 'P' and numSurrounding == 1)
-
-# checks the top, bottom, left, and right edge of the map for a "point" piece
-def findStart (arr, n, m):
+# yields the tiles on the edge of an n by m map in the order they are searched for path starts:
+# the left and right end of each row, then the top and bottom end of each column
+def getEdgeTiles (n, m):
     for i in range(n):
-        if isPoint(arr, i, 0, n, m):
-            return [i, 0]
-        elif isPoint(arr, i, m-1, n, m):
-            return [i, m-1]
+        yield (i, 0)
+        yield (i, m-1)
     for j in range(m):
-        if isPoint(arr, 0, j, n, m):
-            return [0, j]
-        if isPoint(arr, n-1, j, n, m):
-            return [n-1, j]
-    return [-1, -1]
+        yield (0, j)
+        yield (n-1, j)
 
-# generates a list of all "point" pieces as defined above
-def getPoints (arr, n, m):
-    points = []
-    for i in range(n):
-        if isPoint(arr, i, 0, n, m):
-            points.append([i, 0])
-        elif isPoint(arr, i, m-1, n, m):
-            points.append([i, m-1])
-    for j in range(m):
-        if isPoint(arr, 0, j, n, m):
-            points.append([0, j])
-        if isPoint(arr, n-1, j, n, m):
-            points.append([n-1, j])
-    return points
+# returns the path tiles next to r, c
+def getNeighbours (isPath, r, c, n, m):
+    neighbours = []
+    for dr, dc in NEIGHBOURS:
+        nr, nc = r + dr, c + dc
+        if 0 <= nr < n and 0 <= nc < m and isPath[nr][nc]:
+            neighbours.append((nr, nc))
+    return neighbours
+
+# follows the path from an end tile r, c until the other end, appending each tile to path
+def traceSegment (isPath, seen, r, c, n, m, path):
+    prev = None
+    curr = (r, c)
+    while curr is not None:
+        seen[curr[0]][curr[1]] = True
+        path.append([curr[0], curr[1]])
+        neighbours = getNeighbours(isPath, curr[0], curr[1], n, m)
+        if len(neighbours) > 2:
+            raise Exception(f"Invalid map: the path branches at row {curr[0]}, column {curr[1]}")
+        nxt = None
+        for tile in neighbours:
+            if tile != prev:
+                nxt = tile
+        prev, curr = curr, nxt
 
-# modifies path list to contain in-order coordinates of balloon path location, starting from r, c
-def floodFill (arr, bools, r, c, n, m, path): 
-    # out of bounds
-    if r < 0 or r >= n or c < 0 or c >= m:
-        return False
-    # already seen
-    if bools[r][c]:
-        return False
-    # valid path
-    if arr[r][c][0] == 'P':
-        path.append([r, c])
-        bools[r][c] = True
-    # not a path
-    else:
-        return False
-    
-    floodFill(arr, bools, r+1, c, n, m, path)
-    floodFill(arr, bools, r, c-1, n, m, path)
-    floodFill(arr, bools, r-1, c, n, m, path)
-    floodFill(arr, bools, r, c+1, n, m, path)
+# explains why the path tiles connected to r, c were not reached from an end on the edge of the map
+def describeUnreachedSegment (isPath, r, c, n, m):
+    stack = [(r, c)]
+    seen = {(r, c)}
+    hasEnd = False
+    while stack:
+        tile = stack.pop()
+        neighbours = getNeighbours(isPath, tile[0], tile[1], n, m)
+        if len(neighbours) > 2:
+            return f"the path branches at row {tile[0]}, column {tile[1]}"
+        if len(neighbours) <= 1:
+            hasEnd = True
+        for neighbour in neighbours:
+            if neighbour not in seen:
+                seen.add(neighbour)
+                stack.append(neighbour)
+    if not hasEnd:
+        return f"the path through row {r}, column {c} is a loop with no end"
+    return f"the path through row {r}, column {c} does not start at the edge of the map"
 
 def get_path(fname):
     import ast
@@ -74,17 +68,32 @@ def get_path(fname):
     arrAsStr = file.readline()
     file.close()
 
-    arr = ast.literal_eval(arrAsStr)
+    return get_path_from_array(ast.literal_eval(arrAsStr))
+
+# returns the in-order [row, column] coordinates of the path in an already parsed map
+# The path may be made of several segments. Each one starts at an end tile on the edge of the map,
+# and segments are taken in the order getEdgeTiles reaches their start.
+# Raises an exception if the path branches, loops, or has a segment with no end on the edge.
+def get_path_from_array(arr):
     n = len(arr)
     m = len(arr[0])
-    bools = [[False for i in range(m)] for j in range(n)]
-
-    points = getPoints(arr, n, m)
+    for row in arr:
+        if len(row) != m:
+            raise Exception("Invalid map: not every row has the same number of tiles")
+    isPath = [[cell[0] == 'P' for cell in row] for row in arr]
+    numPath = sum(sum(row) for row in isPath)
+    if numPath == 0:
+        raise Exception("Invalid map: there are no path tiles")
 
+    seen = [[False for j in range(m)] for i in range(n)]
     path = []
-    for corr in points :
-        if(corr not in path):
-            currPath = []
-            floodFill(arr, bools, corr[0], corr[1], n, m, currPath)
-            path.extend(currPath)
+    for r, c in getEdgeTiles(n, m):
+        if isPath[r][c] and not seen[r][c] and len(getNeighbours(isPath, r, c, n, m)) <= 1:
+            traceSegment(isPath, seen, r, c, n, m, path)
+
+    if len(path) < numPath:
+        for r in range(n):
+            for c in range(m):
+                if isPath[r][c] and not seen[r][c]:
+                    raise Exception(f"Invalid map: {describeUnreachedSegment(isPath, r, c, n, m)}")
     return path
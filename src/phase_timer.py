@@ -0,0 +1,95 @@
+# Optional timing of the phases of each turn
+# Games only time themselves when created with timing=True. Otherwise the timer
+# is None and every timed phase costs one truthiness check.
+# A game's timings are written, named after the game and its seed, as:
+#   <game>.phases.csv  -> one row per phase: count, total, share of turn time, mean and percentiles
+#   <game>.trace.json  -> every timed phase of every turn, for chrome://tracing or Perfetto
+
+import csv
+import json
+import os
+import time
+from typing import List
+import numpy as np
+
+class PhaseTimer:
+    '''
+    Records how long each phase of each turn takes. Callers take a start time with
+    time.perf_counter_ns() and hand it to record() when the phase ends. record()
+    returns the end time, which can be used as the start of the next phase.
+    '''
+    def __init__(self):
+        self.origin = time.perf_counter_ns()
+        self.events = []  # (phase, turn, start_ns, end_ns)
+
+    def record(self, phase: str, turn: int, start: int) -> int:
+        end = time.perf_counter_ns()
+        self.events.append((phase, turn, start, end))
+        return end
+
+    def get_durations(self) -> dict:
+        '''
+        Returns the duration in nanoseconds of every recorded run of each phase,
+        with phases in the order they were first seen.
+        '''
+        durations = {}
+        for phase, _, start, end in self.events:
+            durations.setdefault(phase, []).append(end - start)
+        return durations
+
+    def summarize(self) -> List[dict]:
+        durations = self.get_durations()
+        turn_total = sum(durations.get("turn", [])) or None
+        rows = []
+        for phase, times in durations.items():
+            times = np.array(times, dtype=np.float64) / 1000  # microseconds
+            total = times.sum()
+            p50, p90, p99 = np.percentile(times, [50, 90, 99]).tolist()
+            rows.append({
+                "phase": phase,
+                "count": len(times),
+                "total_ms": round(total / 1000, 3),
+                "turn_share": round(total * 1000 / turn_total, 4) if turn_total else None,
+                "mean_us": round(total / len(times), 2),
+                "p50_us": round(p50, 2),
+                "p90_us": round(p90, 2),
+                "p99_us": round(p99, 2),
+                "max_us": round(times.max(), 2)
+            })
+        return rows
+
+    def write_csv(self, path: str):
+        rows = self.summarize()
+        if len(rows) == 0:
+            return
+        with open(path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+            writer.writeheader()
+            writer.writerows(rows)
+
+    def write_chrome_trace(self, path: str, game_name: str):
+        events = [{"name": "process_name", "ph": "M", "pid": 0, "args": {"name": game_name}}]
+        for phase, turn, start, end in self.events:
+            events.append({
+                "name": phase,
+                "ph": "X",
+                "pid": 0,
+                "tid": 0,
+                "ts": (start - self.origin) / 1000,
+                "dur": (end - start) / 1000,
+                "args": {"turn": turn}
+            })
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+    def export(self, output_dir: str, game_name: str):
+        os.makedirs(output_dir, exist_ok=True)
+        self.write_csv(os.path.join(output_dir, f"{game_name}.phases.csv"))
+        self.write_chrome_trace(os.path.join(output_dir, f"{game_name}.trace.json"), game_name)
+
+    def print_summary(self):
+        print(f"{'phase':<16}{'count':>8}{'total ms':>12}{'share':>8}{'mean us':>10}{'p50 us':>10}{'p99 us':>10}")
+        for row in self.summarize():
+            share = f"{row['turn_share']:.1%}" if row["turn_share"] is not None else ""
+            print(f"{row['phase']:<16}{row['count']:>8}{row['total_ms']:>12.1f}{share:>8}"
+                  f"{row['mean_us']:>10.1f}{row['p50_us']:>10.1f}{row['p99_us']:>10.1f}")
@@ -0,0 +1,207 @@
+# Drawing of game states with pygame
+# The map never changes during a game, so it is drawn once onto a background
+# surface. Towers change rarely, so they are drawn onto a copy of the background
+# (the board) that is only redrawn when a tower is built or sold. Each frame then
+# only draws what moves (debris counts, snipes, bombs and the text), and only
+# the parts of the screen drawn this frame or the last one are restored from the
+# board and sent to the display.
+# With a target fps, frames that come sooner than the display needs them are
+# skipped, so drawing costs at most fps frames' worth of time per second.
+# A headless renderer draws to an offscreen surface instead of a window, for
+# exporting frames (see replay_export).
+
+import math
+import time
+from typing import Optional
+import numpy as np
+from src.debris import DebrisTable
+from src.game_constants import Team, Tile, TowerType
+
+TILE_COLORS = {Tile.SPACE: (50, 50, 50), Tile.PATH: (128, 0, 128), Tile.ASTEROID: (128, 128, 128)}
+TEXT_COLOR = (255, 255, 255)
+TEAM_COLORS = {Team.BLUE: (0, 0, 255), Team.RED: (255, 0, 0)}
+TOWER_COLORS = {
+    TowerType.SOLAR_FARM: (255, 255, 0),
+    TowerType.BOMBER: (0, 0, 0),
+    TowerType.GUNSHIP: (0, 204, 204),
+    TowerType.REINFORCER: (0, 204, 0)
+}
+
+class Renderer:
+    '''
+    Draws game states to a pygame window. fps is the most frames to draw per second;
+    when skip_frames is set, states that arrive faster than that are not drawn,
+    otherwise render() waits until the next frame is due. fps=None draws every state
+    as soon as it arrives. A headless renderer opens no window; frames are left in self.screen.
+    '''
+    def __init__(self, map, tile_size=20, fps: Optional[float] = None, skip_frames=True, headless=False):
+        import pygame
+        self.pygame = pygame
+        self.map = map
+        self.tile_size = tile_size
+        self.frame_time = 1 / fps if fps else 0
+        self.skip_frames = skip_frames
+        self.last_frame = None
+        self.headless = headless
+
+        size = (map.width*2 * tile_size, map.height * tile_size)
+        if headless:
+            pygame.font.init()
+            self.screen = pygame.Surface(size)
+        else:
+            pygame.init()
+            pygame.display.set_caption("GameState visualizer")
+            self.screen = pygame.display.set_mode(size)
+        self.font = pygame.font.SysFont('Comic Sans MS', 10)
+        self.count_glyphs = {}  # debris count -> rendered text
+        self.labels = {}  # label position -> (text, rendered text)
+
+        self.background = self.draw_background()
+        self.board = self.background.copy()
+        self.board_towers = None
+        self.dirty = []  # screen areas drawn over the board last frame
+
+    def get_screen_coords(self, team: Team, x: int, y: int) -> tuple:
+        # Screen coordinates of a map tile in the form ((left, top), (width, height))
+        left = x * self.tile_size
+        if team == Team.RED:  # Red is on the right
+            left += self.map.width * self.tile_size
+        top = (self.map.height - 1 - y) * self.tile_size
+        return ((left, top), (self.tile_size, self.tile_size))
+
+    def get_center(self, team: Team, x: int, y: int) -> tuple:
+        ((left, top), (width, height)) = self.get_screen_coords(team, x, y)
+        return (left + width/2, top + height/2)
+
+    def draw_background(self):
+        pygame = self.pygame
+        # One pixel per tile, colored by tile type, then scaled up to the tile size
+        palette = np.zeros((max(tile.value for tile in Tile) + 1, 3), dtype=np.uint8)
+        for tile, color in TILE_COLORS.items():
+            palette[tile.value] = color
+        pixels = palette[self.map.tile_array]
+        pixels = pixels[:, ::-1]  # y grows upwards on the map, downwards on screen
+        side = pygame.transform.scale(pygame.surfarray.make_surface(pixels),
+                                      (self.map.width * self.tile_size, self.map.height * self.tile_size))
+
+        background = pygame.Surface(self.screen.get_size())
+        background.blit(side, (0, 0))
+        background.blit(side, (self.map.width * self.tile_size, 0))
+
+        # Line separating blue and red sides
+        pygame.draw.line(
+            background,
+            TEXT_COLOR,
+            (self.map.width * self.tile_size, 0),
+            (self.map.width * self.tile_size, self.map.height * self.tile_size)
+        )
+        return background
+
+    def draw_board(self, towers: dict):
+        pygame = self.pygame
+        self.board.blit(self.background, (0, 0))
+        for team in Team:
+            for tower in towers[team].values():
+                center = self.get_center(team, tower.x, tower.y)
+                pygame.draw.circle(self.board, TEAM_COLORS[team], center, 6)
+                pygame.draw.circle(self.board, TOWER_COLORS.get(tower.type, (255, 51, 153)), center, 4)
+
+    def get_debris_counts(self, debris) -> dict:
+        # Number of debris on each tile, as {(x, y): count}
+        if isinstance(debris, DebrisTable):
+            counts = np.bincount(debris.progress, minlength=debris.path_length)
+            return {(int(debris.path_x[i]), int(debris.path_y[i])): int(counts[i]) for i in counts.nonzero()[0]}
+        counts = {}
+        for deb in debris.values():
+            counts[(deb.x, deb.y)] = counts.get((deb.x, deb.y), 0) + 1
+        return counts
+
+    def draw_count(self, team: Team, x: int, y: int, count: int):
+        glyph = self.count_glyphs.get(count)
+        if glyph is None:
+            glyph = self.count_glyphs[count] = self.font.render(str(count), True, TEXT_COLOR)
+        return self.screen.blit(glyph, glyph.get_rect(center=self.get_center(team, x, y)))
+
+    def draw_label(self, text: str, position: tuple):
+        # Labels are only rendered again when their text changes
+        cached = self.labels.get(position)
+        if cached is None or cached[0] != text:
+            cached = self.labels[position] = (text, self.font.render(text, True, TEXT_COLOR))
+        return self.screen.blit(cached[1], position)
+
+    def render(self, gs, force=False):
+        '''
+        Draws a game state, unless frames are skipped and the next frame is not due yet.
+        force draws it regardless.
+        '''
+        pygame = self.pygame
+        now = time.perf_counter()
+        if self.last_frame is not None and not force:
+            wait = self.last_frame + self.frame_time - now
+            if wait > 0:
+                if self.skip_frames:
+                    return
+                time.sleep(wait)
+                now = time.perf_counter()
+        self.last_frame = now
+
+        # For performance
+        if not self.headless:
+            pygame.event.get()
+
+        towers = tuple(tuple(gs.towers[team]) for team in Team)
+        if towers != self.board_towers:
+            self.board_towers = towers
+            self.draw_board(gs.towers)
+            self.screen.blit(self.board, (0, 0))
+            full_redraw = True
+        else:
+            for rect in self.dirty:
+                self.screen.blit(self.board, rect, rect)
+            full_redraw = False
+
+        drawn = []
+        # Debris as text indicating number of debris on that tile
+        for team in Team:
+            for (x, y), count in self.get_debris_counts(gs.debris[team]).items():
+                drawn.append(self.draw_count(team, x, y, count))
+
+        # Snipes as lines from tower to debris
+        for team in Team:
+            for ((tower_x, tower_y), (debris_x, debris_y)) in gs.current_snipes[team]:
+                drawn.append(pygame.draw.line(
+                    self.screen,
+                    TEAM_COLORS[team],
+                    self.get_center(team, tower_x, tower_y),
+                    self.get_center(team, debris_x, debris_y)
+                ))
+
+        # Bombs as circles
+        for team in Team:
+            for (x, y) in gs.current_bombs[team]:
+                drawn.append(pygame.draw.circle(
+                    self.screen,
+                    (0, 0, 0),
+                    self.get_center(team, x, y),
+                    math.sqrt(TowerType.BOMBER.range) * self.tile_size,
+                    1  # circle outline width
+                ))
+
+        # Turn number in bottom left, and each team's balance, health and time remaining
+        half = self.screen.get_width()//2
+        drawn.append(self.draw_label(f"Turn: {gs.turn}", (2, self.screen.get_height()-20)))
+        drawn.append(self.draw_label(f"Balance: {gs.balance[Team.BLUE]}", (2, 0)))
+        drawn.append(self.draw_label(f"Balance: {gs.balance[Team.RED]}", (half+2, 0)))
+        drawn.append(self.draw_label(f"Health: {gs.health[Team.BLUE]}", (2, 20)))
+        drawn.append(self.draw_label(f"Health: {gs.health[Team.RED]}", (half+2, 20)))
+        drawn.append(self.draw_label(f"Time: {gs.time_remaining[Team.BLUE]: .2f}", (2, 40)))
+        drawn.append(self.draw_label(f"Time: {gs.time_remaining[Team.RED]: .2f}", (half+2, 40)))
+
+        screen_rect = self.screen.get_rect()
+        drawn = [rect.clip(screen_rect) for rect in drawn]
+        if not self.headless:
+            if full_redraw:
+                pygame.display.update()
+            else:
+                pygame.display.update(self.dirty + drawn)
+        self.dirty = drawn
@@ -1,8 +1,9 @@
 from dataclasses import dataclass
-import compress_json
 from src.game_constants import Team, TowerType
 from src.game_state import GameState
 from src.map import Map
+from src.replay_io import make_replay_sink
+from src.action_log import get_action_record
 from typing import List
 
 @dataclass
@@ -54,6 +55,7 @@ class ReplayMetadata:
     blue_bot: str
     winner: str
     scores: List[float]
+    seed: int = None
 
 class Replay:
     def __init__(
@@ -61,7 +63,10 @@ class Replay:
             game_name: str,
             map: Map,
             blue_bot: str,
-            red_bot: str
+            red_bot: str,
+            output_dir: str = "replays",
+            format: str = "json",
+            seed: int = None
     ):
         self.metadata = ReplayMetadata(
             game_name=game_name,
@@ -72,11 +77,25 @@ class Replay:
             blue_bot=blue_bot,
             red_bot=red_bot,
             winner="none",
-            scores=[0.0, 0.0]
+            scores=[0.0, 0.0],
+            seed=seed
         )
-        self.turns = []
+        self.sink = make_replay_sink(format, output_dir, game_name, self.metadata.__dict__)
 
-    def add_turn(self, gs: GameState):
+    @property
+    def records_actions(self) -> bool:
+        return self.sink.records_actions
+
+    def add_turn(self, gs: GameState, actions: dict = None):
+        '''
+        Records the turn gs just played. actions holds each team's actions during it, and
+        is only needed when records_actions is set.
+        '''
+        if self.sink.records_actions:
+            self.sink.write_turn(get_action_record(gs, actions))
+            return
+        if not self.sink.records_turns:
+            return
         turn = ReplayTurn(
             turn_number=gs.turn,
             blue_balance=gs.balance[Team.BLUE],
@@ -137,7 +156,7 @@ class Replay:
                     turn.blue_debris.append(replay_deb.__dict__)
                 else:
                     turn.red_debris.append(replay_deb.__dict__)
-        self.turns.append(turn.__dict__)
+        self.sink.write_turn(turn.__dict__)
 
     def set_winner(self, winner: Team):
         if winner == Team.BLUE:
@@ -147,9 +166,5 @@ class Replay:
             self.metadata.winner = "red"
             self.metadata.scores = [0.0, 1.0]
 
-    def write_json(self):
-        res = {
-            "metadata": self.metadata.__dict__,
-            "turns": self.turns
-        }
-        compress_json.dump(res, f"replays/{self.metadata.game_name}.awap24r.gz")
+    def close(self):
+        self.sink.close(self.metadata.__dict__)
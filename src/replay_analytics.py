@@ -0,0 +1,192 @@
+# Per-turn tables and per-match metrics from replays, for analysis in bulk
+# Each replay is decoded once, by a pool of worker processes, into columns with
+# one value per turn, written as <output_dir>/<replay name>.turns.npz:
+#   turn                                -> turn number
+#   <team>_balance, <team>_health       -> at the end of the turn
+#   <team>_damage_taken                 -> health lost during the turn
+#   <team>_time_remaining               -> the bot's time pool
+#   <team>_debris, <team>_debris_health -> debris alive on the team's side and their total health
+#   <team>_sent_debris                  -> how many of those the opponent sent
+#   <team>_<tower type>s                -> towers of each type
+#   <team>_snipes, <team>_bombs         -> attacks made during the turn
+# The replay's metadata is stored alongside, as JSON under "metadata".
+# Tables are only rebuilt when the replay is newer than its table, so rescanning
+# a directory only decodes new replays. np.load(path) reads a table back; pandas
+# users can wrap it in pd.DataFrame({key: table[key] for key in table.files if key != "metadata"}).
+
+import json
+import multiprocessing
+import os
+from typing import List, Optional
+import numpy as np
+from src.replay_io import ReplayReader, load_replay
+
+TEAMS = ["blue", "red"]
+TOWER_TYPES = ["solar_farm", "gunship", "bomber", "reinforcer"]
+REPLAY_SUFFIXES = [".awap24r.jsonl.gz", ".awap24r.gz", ".awap24r"]
+
+def get_replay_name(path: str) -> Optional[str]:
+    # The file name without its replay suffix, or None if it isn't a replay
+    name = os.path.basename(path)
+    for suffix in REPLAY_SUFFIXES:
+        if name.endswith(suffix):
+            return name[:-len(suffix)]
+    return None
+
+def find_replays(paths: List[str]) -> List[str]:
+    '''
+    Returns every replay in the given files and directories.
+    '''
+    replays = []
+    for path in paths:
+        if os.path.isdir(path):
+            replays.extend(sorted(os.path.join(path, name) for name in os.listdir(path) if get_replay_name(name)))
+        elif get_replay_name(path):
+            replays.append(path)
+    return replays
+
+def read_replay(path: str):
+    # Streamed replays are decoded a turn at a time; the others only load whole
+    if path.endswith(".awap24r.jsonl.gz"):
+        with ReplayReader(path) as reader:
+            return reader.metadata, list(reader.get_turns(0, len(reader)))
+    replay = load_replay(path)
+    return replay["metadata"], replay["turns"]
+
+def extract_columns(turns: List[dict]) -> dict:
+    '''
+    Returns the per-turn columns of a replay's turns as numpy arrays.
+    '''
+    rows = {"turn": []}
+    for team in TEAMS:
+        for column in ["balance", "health", "time_remaining", "debris", "debris_health", "sent_debris", "snipes", "bombs"]:
+            rows[f"{team}_{column}"] = []
+        for tower_type in TOWER_TYPES:
+            rows[f"{team}_{tower_type}s"] = []
+
+    for turn in turns:
+        rows["turn"].append(turn["turn_number"])
+        for team in TEAMS:
+            rows[f"{team}_balance"].append(turn[f"{team}_balance"])
+            rows[f"{team}_health"].append(turn[f"{team}_health"])
+            rows[f"{team}_time_remaining"].append(turn[f"{team}_time_remaining"])
+
+            debris = turn[f"{team}_debris"]
+            rows[f"{team}_debris"].append(len(debris))
+            rows[f"{team}_debris_health"].append(sum(deb["health"] for deb in debris))
+            rows[f"{team}_sent_debris"].append(sum(1 for deb in debris if deb["sent_by_opponent"]))
+            rows[f"{team}_snipes"].append(len(turn[f"{team}_snipes"]))
+            rows[f"{team}_bombs"].append(len(turn[f"{team}_bombs"]))
+
+            counts = dict.fromkeys(TOWER_TYPES, 0)
+            for tower in turn[f"{team}_towers"]:
+                counts[tower["type"]] += 1
+            for tower_type in TOWER_TYPES:
+                rows[f"{team}_{tower_type}s"].append(counts[tower_type])
+
+    columns = {}
+    for key, values in rows.items():
+        if key.endswith("time_remaining"):
+            columns[key] = np.array(values, dtype=np.float32)
+        elif key.endswith(("balance", "health")):
+            # Fractional in general, and debris health grows without bound late in the game
+            columns[key] = np.array(values, dtype=np.float64)
+        else:
+            columns[key] = np.array(values, dtype=np.int32)
+    for team in TEAMS:
+        health = columns[f"{team}_health"]
+        columns[f"{team}_damage_taken"] = np.maximum(0, -np.diff(health, prepend=health[:1]))
+    return columns
+
+def get_lead_turn(columns: dict, key: str) -> tuple:
+    '''
+    Returns the team ahead in the column on the last turn and the turn from which
+    it stayed ahead, or (None, None) if neither is ahead at the end.
+    '''
+    difference = np.sign(columns[f"blue_{key}"].astype(np.float64) - columns[f"red_{key}"])
+    if len(difference) == 0 or difference[-1] == 0:
+        return None, None
+    behind = np.flatnonzero(difference != difference[-1])
+    first = behind[-1] + 1 if len(behind) > 0 else 0
+    return ("blue" if difference[-1] > 0 else "red"), int(columns["turn"][first])
+
+def summarize_match(path: str, metadata: dict, columns: dict) -> dict:
+    '''
+    Returns the metrics of one match, as a row of the summary.
+    '''
+    row = {
+        "replay": os.path.basename(path),
+        "map": metadata["map_name"],
+        "blue_bot": metadata["blue_bot"],
+        "red_bot": metadata["red_bot"],
+        "winner": metadata["winner"],
+        "turns": len(columns["turn"])
+    }
+    for team in TEAMS:
+        towers = sum(columns[f"{team}_{tower_type}s"] for tower_type in TOWER_TYPES)
+        built = np.flatnonzero(towers)
+        row[f"{team}_final_health"] = float(columns[f"{team}_health"][-1])
+        row[f"{team}_final_balance"] = float(columns[f"{team}_balance"][-1])
+        row[f"{team}_damage_taken"] = float(columns[f"{team}_damage_taken"].sum())
+        row[f"{team}_peak_towers"] = int(towers.max())
+        row[f"{team}_peak_solar_farms"] = int(columns[f"{team}_solar_farms"].max())
+        row[f"{team}_first_tower_turn"] = int(columns["turn"][built[0]]) if len(built) > 0 else None
+        row[f"{team}_min_time_remaining"] = round(float(columns[f"{team}_time_remaining"].min()), 3)
+    # "Economy" is the number of solar farms, the only source of income besides the passive one
+    row["economy_leader"], row["economy_lead_turn"] = get_lead_turn(columns, "solar_farms")
+    row["health_leader"], row["health_lead_turn"] = get_lead_turn(columns, "health")
+    return row
+
+def get_table_path(output_dir: str, path: str) -> str:
+    return os.path.join(output_dir, f"{get_replay_name(path)}.turns.npz")
+
+def analyze_replay(path: str, output_dir: str, force=False) -> dict:
+    '''
+    Writes the per-turn table of a replay, unless an up to date one exists, and returns
+    the replay's summary row.
+    '''
+    table_path = get_table_path(output_dir, path)
+    if not force and os.path.exists(table_path) and os.path.getmtime(table_path) >= os.path.getmtime(path):
+        with np.load(table_path) as table:
+            metadata = json.loads(str(table["metadata"]))
+            columns = {key: table[key] for key in table.files if key != "metadata"}
+    else:
+        metadata, turns = read_replay(path)
+        if len(turns) == 0:
+            raise Exception(f"Replay {path} has no turns")
+        columns = extract_columns(turns)
+        del turns
+        # Written next to the table and renamed, so an interrupted run leaves no half-written table
+        temp_path = f"{table_path}.{os.getpid()}.tmp.npz"
+        np.savez_compressed(temp_path, metadata=np.array(json.dumps(metadata)), **columns)
+        os.replace(temp_path, table_path)
+    return summarize_match(path, metadata, columns)
+
+def _analyze_replay_task(args) -> tuple:
+    path, output_dir, force = args
+    try:
+        return path, analyze_replay(path, output_dir, force), None
+    except Exception as e:
+        return path, None, f"{type(e).__name__}: {e}"
+
+def analyze_replays(paths: List[str], output_dir: str, num_workers: Optional[int] = None, force=False) -> List[dict]:
+    '''
+    Analyzes every replay in parallel and returns their summary rows, sorted by replay.
+    Replays that can't be read are reported and left out.
+    '''
+    os.makedirs(output_dir, exist_ok=True)
+    tasks = [(path, output_dir, force) for path in paths]
+    rows = []
+    done = 0
+    with multiprocessing.Pool(num_workers) as pool:
+        # Biggest first, so a large replay doesn't start last and hold up the end
+        tasks.sort(key=lambda task: -os.path.getsize(task[0]))
+        for path, row, error in pool.imap_unordered(_analyze_replay_task, tasks):
+            done += 1
+            if error is not None:
+                print(f"[{done}/{len(tasks)}] {path}: skipped ({error})")
+                continue
+            rows.append(row)
+            print(f"[{done}/{len(tasks)}] {path}: {row['turns']} turns")
+    rows.sort(key=lambda row: row["replay"])
+    return rows
@@ -0,0 +1,83 @@
+# Keyframe + delta encoding of replay turns
+# A delta holds only what changed since the previous turn: scalar fields that
+# differ, and for each tower/debris list the entities added, removed, or with
+# changed fields. Applying every delta after a keyframe rebuilds the full turns.
+
+# Turn fields holding lists of entities identified by "id"
+ENTITY_KEYS = ["blue_towers", "red_towers", "blue_debris", "red_debris"]
+
+def diff_entities(prev: list, cur: list) -> dict:
+    prev_by_id = {entity["id"]: entity for entity in prev}
+    cur_ids = set()
+    add = []
+    update = []
+    for entity in cur:
+        cur_ids.add(entity["id"])
+        old = prev_by_id.get(entity["id"])
+        if old is None:
+            add.append(entity)
+            continue
+        changes = {key: value for key, value in entity.items() if old.get(key) != value}
+        if changes:
+            changes["id"] = entity["id"]
+            update.append(changes)
+    remove = [entity_id for entity_id in prev_by_id if entity_id not in cur_ids]
+
+    delta = {}
+    if add:
+        delta["add"] = add
+    if remove:
+        delta["remove"] = remove
+    if update:
+        delta["update"] = update
+    return delta
+
+def apply_entity_delta(prev: list, delta: dict) -> list:
+    entities = {entity["id"]: entity for entity in prev}
+    for entity_id in delta.get("remove", []):
+        del entities[entity_id]
+    for changes in delta.get("update", []):
+        entities[changes["id"]] = {**entities[changes["id"]], **changes}
+    for entity in delta.get("add", []):
+        entities[entity["id"]] = entity
+    return list(entities.values())
+
+def diff_turn(prev: dict, cur: dict) -> dict:
+    '''
+    Returns the delta that turns prev into cur.
+    '''
+    delta = {}
+    for key, value in cur.items():
+        if key in ENTITY_KEYS:
+            entity_delta = diff_entities(prev[key], value)
+            if entity_delta:
+                delta[key] = entity_delta
+        elif prev.get(key) != value:
+            delta[key] = value
+    return delta
+
+def apply_delta(prev: dict, delta: dict) -> dict:
+    '''
+    Returns the turn after prev described by delta. prev is left untouched.
+    '''
+    turn = dict(prev)
+    for key, value in delta.items():
+        if key in ENTITY_KEYS:
+            turn[key] = apply_entity_delta(prev[key], value)
+        else:
+            turn[key] = value
+    return turn
+
+def encode_turns(turns: list) -> list:
+    '''
+    Encodes consecutive turns as one keyframe followed by deltas.
+    '''
+    records = []
+    prev = None
+    for turn in turns:
+        if prev is None:
+            records.append({"keyframe": turn})
+        else:
+            records.append({"delta": diff_turn(prev, turn)})
+        prev = turn
+    return records
@@ -0,0 +1,105 @@
+# Exporting replays as images without a display
+# Frames are drawn offscreen by a headless Renderer. The turns to export are split
+# into contiguous ranges, one worker process per range at a time, so each worker
+# decodes its turns in order (see ReplayReader) and draws them independently.
+# Workers write one numbered PNG per frame:
+#   image sequence -> the PNGs are the output
+#   gif            -> the PNGs are reduced to 256 colors by the workers, then the
+#                     main process joins them into an animated GIF (needs Pillow)
+
+import multiprocessing
+import os
+import shutil
+import tempfile
+from typing import List, Optional
+from src.game_state import GameState
+from src.map import Map
+from src.renderer import Renderer
+from src.replay_io import ReplayReader
+from src.replay_state import set_turn
+
+def get_frame_indices(num_turns: int, start=0, end: Optional[int] = None, every=1) -> List[int]:
+    '''
+    Returns the indices of the replay turns to export: every n-th turn in [start, end).
+    '''
+    end = num_turns if end is None else min(end, num_turns)
+    return list(range(max(0, start), end, every))
+
+def split_ranges(indices: List[int], num_ranges: int) -> List[List[int]]:
+    size = -(-len(indices) // num_ranges)
+    return [indices[i:i + size] for i in range(0, len(indices), size)]
+
+def get_frame_path(frame_dir: str, index: int) -> str:
+    return os.path.join(frame_dir, f"frame_{index:06d}.png")
+
+def render_frames(replay_path: str, map_path: str, indices: List[int], frame_dir: str, tile_size: int, palette: bool) -> int:
+    '''
+    Draws the given turns of a replay to PNGs in frame_dir. With palette, frames are
+    reduced to 256 colors, ready to go into a GIF.
+    '''
+    import pygame
+    gs = GameState(Map(map_path))
+    renderer = Renderer(gs.map, tile_size=tile_size, headless=True)
+    with ReplayReader(replay_path) as reader:
+        for index in indices:
+            set_turn(gs, reader.get_turn(index))
+            renderer.render(gs, force=True)
+            path = get_frame_path(frame_dir, index)
+            if palette:
+                from PIL import Image
+                size = renderer.screen.get_size()
+                image = Image.frombytes("RGB", size, pygame.image.tobytes(renderer.screen, "RGB"))
+                # Frames have far fewer than 256 colors, so the fast quantizer loses nothing visible
+                image.quantize(256, method=Image.Quantize.FASTOCTREE).save(path)
+            else:
+                pygame.image.save(renderer.screen, path)
+    return len(indices)
+
+def write_gif(frame_paths: List[str], output_path: str, fps: float):
+    from PIL import Image
+    frames = (Image.open(path) for path in frame_paths)
+    first = next(frames)
+    first.save(output_path, save_all=True, append_images=frames, duration=round(1000 / fps), loop=0)
+
+def export_replay(replay_path: str, output_path: str, map_path: Optional[str] = None, start=0, end: Optional[int] = None,
+                  every=1, fps=30, tile_size=10, processes: Optional[int] = None) -> int:
+    '''
+    Exports turns of a replay to output_path, as an animated GIF if it ends in .gif and
+    as a directory of numbered PNGs otherwise. Returns the number of frames exported.
+    '''
+    gif = output_path.lower().endswith(".gif")
+    if gif:
+        try:
+            import PIL
+        except ImportError:
+            raise Exception("Exporting GIFs needs Pillow: pip install pillow")
+
+    # Opening the replay here writes its index before the workers need it
+    with ReplayReader(replay_path) as reader:
+        metadata = reader.metadata
+        indices = get_frame_indices(len(reader), start, end, every)
+    if len(indices) == 0:
+        raise Exception(f"No turns of {replay_path} to export")
+    map_path = map_path or os.path.join("maps", f"{metadata['map_name']}.awap24m")
+    Map(map_path)  # compile the map once rather than in every worker
+
+    processes = processes or os.cpu_count() or 1
+    # A few ranges per worker so one slow range doesn't hold up the rest
+    ranges = split_ranges(indices, processes * 4)
+
+    frame_dir = tempfile.mkdtemp(dir=os.path.dirname(os.path.abspath(output_path))) if gif else output_path
+    os.makedirs(frame_dir, exist_ok=True)
+    try:
+        jobs = [(replay_path, map_path, frame_range, frame_dir, tile_size, gif) for frame_range in ranges]
+        if processes == 1:
+            for job in jobs:
+                render_frames(*job)
+        else:
+            with multiprocessing.Pool(processes) as pool:
+                pool.starmap(render_frames, jobs)
+        if gif:
+            write_gif([get_frame_path(frame_dir, index) for index in indices], output_path, fps)
+    finally:
+        if gif:
+            shutil.rmtree(frame_dir, ignore_errors=True)
+    return len(indices)
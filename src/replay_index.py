@@ -0,0 +1,143 @@
+# Sidecar index for random access into replay files
+# The index lives next to the replay as <replay>.idx and records where each
+# turn starts, so a reader can decode just the turns it needs:
+#   streamed replays (.awap24r.jsonl.gz) -> the offset of every gzip member
+#       and the first turn in it; each member can be decompressed on its own
+#   .awap24r                             -> the byte range of every turn
+#   .awap24r.gz                          -> the byte range of every turn in the
+#       decompressed data; reaching it still means inflating from the start
+#       of the file, so convert to a streamed format for constant-time seeks
+
+import gzip
+import json
+import os
+import zlib
+
+INDEX_VERSION = 1
+
+def get_index_path(path: str) -> str:
+    return path + ".idx"
+
+def get_source_stamp(path: str) -> list:
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+def save_index(path: str, index: dict):
+    index = {**index, "version": INDEX_VERSION, "source": get_source_stamp(path)}
+    try:
+        with open(get_index_path(path), "w") as f:
+            json.dump(index, f)
+    except OSError:
+        pass  # read-only location; the index is rebuilt next time
+
+def load_index(path: str) -> dict:
+    '''
+    Returns the index of a replay, reading the sidecar if it is up to date and
+    building (and saving) it otherwise.
+    '''
+    try:
+        with open(get_index_path(path), "r") as f:
+            index = json.load(f)
+        if index.get("version") == INDEX_VERSION and index.get("source") == get_source_stamp(path):
+            return index
+    except (OSError, ValueError):
+        pass
+    index = build_index(path)
+    save_index(path, index)
+    return index
+
+def build_index(path: str) -> dict:
+    if path.endswith(".awap24r.jsonl.gz"):
+        return build_streamed_index(path)
+    elif path.endswith(".awap24r.gz"):
+        with gzip.open(path, "rb") as f:
+            index = build_json_index(f.read())
+        index["kind"] = "json.gz"
+        return index
+    elif path.endswith(".awap24r"):
+        with open(path, "rb") as f:
+            index = build_json_index(f.read())
+        index["kind"] = "json"
+        return index
+    raise Exception(f"Not a replay file: {path}")
+
+def build_streamed_index(path: str) -> dict:
+    with open(path, "rb") as f:
+        data = f.read()
+
+    metadata = None
+    blocks = []  # [offset, length, first_turn, num_turns]
+    num_turns = 0
+    offset = 0
+    while offset < len(data):
+        # Feed the member in chunks so the rest of the file isn't copied for every member
+        decompressor = zlib.decompressobj(zlib.MAX_WBITS | 16)
+        pos = offset
+        output = []
+        while not decompressor.eof:
+            chunk = data[pos:pos + 65536]
+            if not chunk:
+                raise Exception(f"Replay {path} ends in the middle of a block")
+            pos += len(chunk)
+            output.append(decompressor.decompress(chunk))
+        lines = b"".join(output).splitlines()
+        length = pos - offset - len(decompressor.unused_data)
+
+        first = json.loads(lines[0])
+        if "metadata" in first:
+            metadata = first["metadata"]
+        elif "result" in first:
+            metadata.update(first["result"])
+        else:
+            blocks.append([offset, length, num_turns, len(lines)])
+            num_turns += len(lines)
+        offset += length
+
+    return {"kind": "stream", "metadata": metadata, "num_turns": num_turns, "blocks": blocks}
+
+def skip_whitespace(text: str, pos: int) -> int:
+    while text[pos] in " \t\r\n":
+        pos += 1
+    return pos
+
+def build_json_index(data: bytes) -> dict:
+    '''
+    Finds the byte range of every turn in a {"metadata": ..., "turns": [...]} document
+    without building the turns themselves.
+    '''
+    # latin-1 maps each byte to one character, so string positions are byte offsets
+    text = data.decode("latin-1")
+    decoder = json.JSONDecoder()
+    metadata = None
+    turns = []
+
+    pos = skip_whitespace(text, 0)
+    if text[pos] != "{":
+        raise Exception("Replay is not a JSON object")
+    pos += 1
+    while True:
+        pos = skip_whitespace(text, pos)
+        if text[pos] == "}":
+            break
+        key, pos = decoder.raw_decode(text, pos)
+        pos = skip_whitespace(text, pos)
+        pos = skip_whitespace(text, pos + 1)  # skip ':'
+        if key == "turns":
+            pos = skip_whitespace(text, pos + 1)  # skip '['
+            while text[pos] != "]":
+                _, end = decoder.raw_decode(text, pos)
+                turns.append([pos, end])
+                pos = skip_whitespace(text, end)
+                if text[pos] == ",":
+                    pos = skip_whitespace(text, pos + 1)
+            pos += 1
+        else:
+            start = pos
+            _, pos = decoder.raw_decode(text, pos)
+            if key == "metadata":
+                metadata = json.loads(data[start:pos])
+        pos = skip_whitespace(text, pos)
+        if text[pos] == ",":
+            pos += 1
+
+    return {"metadata": metadata, "num_turns": len(turns), "turns": turns}
@@ -0,0 +1,275 @@
+# Where replays go once a turn has been recorded, and how to read them back
+# Supported formats:
+#   json   -> <game>.awap24r.gz, one JSON object written when the game ends
+#   stream -> <game>.awap24r.jsonl.gz, newline-delimited JSON written while the game runs
+#   delta  -> <game>.awap24r.jsonl.gz, like stream but with keyframes every N turns and deltas in between
+#   actions -> <game>.awap24a.jsonl.gz, the bots' actions each turn rather than the state (see action_log)
+#   none   -> nothing is written
+
+import bisect
+import gzip
+import json
+import os
+import queue
+import compress_json
+from abc import ABC, abstractmethod
+from threading import Thread
+from src.replay_delta import apply_delta, encode_turns
+from src.replay_index import load_index, save_index
+
+REPLAY_FORMATS = ["json", "stream", "delta", "actions", "none"]
+
+class ReplaySink(ABC):
+    # Whether the sink wants turns at all, so callers can skip building them
+    records_turns = True
+    # Whether the sink wants the actions taken each turn instead of the state
+    records_actions = False
+
+    @abstractmethod
+    def write_turn(self, turn: dict):
+        pass
+
+    @abstractmethod
+    def close(self, metadata: dict):
+        pass
+
+class NullReplaySink(ReplaySink):
+    records_turns = False
+
+    def write_turn(self, turn: dict):
+        pass
+
+    def close(self, metadata: dict):
+        pass
+
+class JsonReplaySink(ReplaySink):
+    '''
+    Keeps every turn in memory and writes one compressed JSON object at the end.
+    '''
+    def __init__(self, path: str):
+        self.path = path
+        self.turns = []
+
+    def write_turn(self, turn: dict):
+        self.turns.append(turn)
+
+    def close(self, metadata: dict):
+        compress_json.dump({"metadata": metadata, "turns": self.turns}, self.path)
+
+class StreamingReplaySink(ReplaySink):
+    '''
+    Writes turns as they are produced, as gzip'd newline-delimited JSON.
+
+    The first record is {"metadata": ...} and the last is {"result": ...}; every
+    record in between is one turn. Turns are collected into blocks which a
+    background thread encodes and compresses, each block into its own gzip
+    member. At most max_pending_blocks blocks wait for the writer, so memory
+    stays flat however long the game runs.
+    '''
+    version = 1
+    writes_index = True
+
+    def __init__(self, path: str, metadata: dict, turns_per_block=50, max_pending_blocks=8):
+        self.path = path
+        self.metadata = {**metadata, "version": self.version}
+        self.turns_per_block = turns_per_block
+        self.block = []
+        self.queue = queue.Queue(max_pending_blocks)
+        self.error = None
+        self.file = None
+        self.thread = None
+        self.index_blocks = []  # [offset, length, first_turn, num_turns] of each block of turns
+        self.num_turns = 0
+
+    def start(self):
+        # Opened on the first turn so games that never start leave no file behind
+        self.file = open(self.path, "wb")
+        self.thread = Thread(target=self.write_blocks, daemon=True)
+        self.thread.start()
+        self.queue.put(([{"metadata": self.metadata}], False))
+
+    def write_turn(self, turn: dict):
+        if self.thread is None:
+            self.start()
+        self.block.append(turn)
+        if len(self.block) >= self.turns_per_block:
+            self.queue.put((self.block, True))
+            self.block = []
+
+    def close(self, metadata: dict):
+        if self.thread is None:
+            self.start()
+        if self.block:
+            self.queue.put((self.block, True))
+            self.block = []
+        self.queue.put(([{"result": {"winner": metadata["winner"], "scores": metadata["scores"]}}], False))
+        self.queue.put(None)
+        self.thread.join()
+        self.file.close()
+        if self.error is not None:
+            raise self.error
+        if not self.writes_index:
+            return
+        save_index(self.path, {
+            "kind": "stream",
+            "metadata": {**self.metadata, "winner": metadata["winner"], "scores": metadata["scores"]},
+            "num_turns": self.num_turns,
+            "blocks": self.index_blocks
+        })
+
+    def encode_turns(self, turns: list) -> list:
+        # Turns to the records written for them; runs on the writer thread
+        return turns
+
+    def write_blocks(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            if self.error is not None:
+                continue  # keep draining so the game loop never blocks
+            block, is_turns = item
+            try:
+                records = self.encode_turns(block) if is_turns else block
+                data = gzip.compress("".join(json.dumps(record) + "\n" for record in records).encode())
+                if is_turns:
+                    self.index_blocks.append([self.file.tell(), len(data), self.num_turns, len(records)])
+                    self.num_turns += len(records)
+                self.file.write(data)
+            except Exception as e:
+                self.error = e
+
+class DeltaReplaySink(StreamingReplaySink):
+    '''
+    Streaming replay where each block starts with a full keyframe and every
+    other turn is stored as a delta from the turn before (see replay_delta).
+    Any turn can be rebuilt from the keyframe at the start of its block.
+    '''
+    version = 2
+
+    def __init__(self, path: str, metadata: dict, keyframe_interval=100, max_pending_blocks=8):
+        super().__init__(path, {**metadata, "keyframe_interval": keyframe_interval}, keyframe_interval, max_pending_blocks)
+
+    def encode_turns(self, turns: list) -> list:
+        return encode_turns(turns)
+
+class ActionReplaySink(StreamingReplaySink):
+    '''
+    Streaming log of the actions the bots took each turn. Turns are read back in
+    order by an ActionLogReader, so no index is written.
+    '''
+    records_turns = False
+    records_actions = True
+    writes_index = False
+
+    def __init__(self, path: str, metadata: dict, turns_per_block=500, max_pending_blocks=8):
+        super().__init__(path, metadata, turns_per_block, max_pending_blocks)
+
+def get_replay_path(output_dir: str, game_name: str, format: str) -> str:
+    if format == "json":
+        return os.path.join(output_dir, f"{game_name}.awap24r.gz")
+    elif format in ["stream", "delta"]:
+        return os.path.join(output_dir, f"{game_name}.awap24r.jsonl.gz")
+    elif format == "actions":
+        return os.path.join(output_dir, f"{game_name}.awap24a.jsonl.gz")
+    raise Exception(f"Replay format {format} is not written to a file")
+
+def make_replay_sink(format: str, output_dir: str, game_name: str, metadata: dict) -> ReplaySink:
+    if format == "none":
+        return NullReplaySink()
+    os.makedirs(output_dir, exist_ok=True)
+    path = get_replay_path(output_dir, game_name, format)
+    if format == "json":
+        return JsonReplaySink(path)
+    elif format == "stream":
+        return StreamingReplaySink(path, metadata)
+    elif format == "delta":
+        return DeltaReplaySink(path, metadata)
+    elif format == "actions":
+        return ActionReplaySink(path, metadata)
+    raise Exception(f"Unknown replay format: {format}. Must be one of {REPLAY_FORMATS}")
+
+class ReplayReader:
+    '''
+    Gives access to the turns of a replay by index without loading the whole file.
+    A sidecar index (see replay_index) says where each turn is, and only the
+    turns asked for are decoded. Delta-encoded turns are rebuilt from the
+    keyframe at the start of their block; the last block is cached, so reading
+    turns in order decodes each block once.
+    '''
+    def __init__(self, path: str):
+        self.path = path
+        self.index = load_index(path)
+        self.metadata = self.index["metadata"]
+        self.kind = self.index["kind"]
+        self.file = gzip.open(path, "rb") if self.kind == "json.gz" else open(path, "rb")
+        self.block_starts = [block[2] for block in self.index.get("blocks", [])]
+        self.block_number = None
+        self.block_lines = None
+        self.block_turns = None
+
+    def __len__(self) -> int:
+        return self.index["num_turns"]
+
+    def __iter__(self):
+        return self.get_turns(0, len(self))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        self.file.close()
+
+    def get_turns(self, start: int, stop: int):
+        '''
+        Yields the turns with indices in [start, stop), decoding them as they are reached.
+        '''
+        for i in range(max(0, start), min(stop, len(self))):
+            yield self.get_turn(i)
+
+    def get_turn(self, index: int) -> dict:
+        if index < 0 or index >= len(self):
+            raise IndexError(f"Replay has no turn at index {index}")
+        if self.kind == "stream":
+            return self.get_streamed_turn(index)
+        start, end = self.index["turns"][index]
+        self.file.seek(start)
+        return json.loads(self.file.read(end - start))
+
+    def get_streamed_turn(self, index: int) -> dict:
+        block_number = bisect.bisect_right(self.block_starts, index) - 1
+        if block_number != self.block_number:
+            offset, length, _, _ = self.index["blocks"][block_number]
+            self.file.seek(offset)
+            self.block_number = block_number
+            self.block_lines = gzip.decompress(self.file.read(length)).splitlines()
+            self.block_turns = []
+
+        # Decode lines of the block up to the one asked for
+        turns = self.block_turns
+        for line in self.block_lines[len(turns):index - self.block_starts[block_number] + 1]:
+            record = json.loads(line)
+            if "keyframe" in record:
+                turns.append(record["keyframe"])
+            elif "delta" in record:
+                turns.append(apply_delta(turns[-1], record["delta"]))
+            else:
+                turns.append(record)
+        return turns[index - self.block_starts[block_number]]
+
+def load_replay(path: str) -> dict:
+    '''
+    Loads a replay in any supported format as {"metadata": ..., "turns": [...]}.
+    '''
+    if path.endswith(".awap24r.jsonl.gz"):
+        with ReplayReader(path) as reader:
+            return {"metadata": reader.metadata, "turns": list(reader)}
+    elif path.endswith(".awap24r.gz"):
+        return compress_json.load(path)
+    elif path.endswith(".awap24r"):
+        with open(path, "r") as f:
+            return json.load(f)
+    raise Exception(f"Not a replay file: {path}")
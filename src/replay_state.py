@@ -0,0 +1,50 @@
+# Rebuilding game states from the turns recorded in a replay, so viewers can draw them
+# Debris are kept as {id: Debris} rather than a DebrisTable; only drawing is supported.
+
+from src.game_constants import Team, TowerType
+from src.game_state import GameState
+from src.tower import Tower
+from src.debris import Debris
+
+TOWER_TYPES = {
+    'solar_farm': TowerType.SOLAR_FARM,
+    'gunship': TowerType.GUNSHIP,
+    'bomber': TowerType.BOMBER,
+    'reinforcer': TowerType.REINFORCER
+}
+
+def get_tower(team, json_tower):
+    res = Tower(team, TOWER_TYPES[json_tower['type']], json_tower['x'], json_tower['y'], json_tower['id'])
+    res.current_cooldown = json_tower['cooldown']
+    return res
+
+def get_debris(team, json_debris):
+    res = Debris(team, json_debris['x'], json_debris['y'], json_debris['max_cooldown'], json_debris['max_health'],
+                 json_debris['sent_by_opponent'], json_debris['id'])
+    res.current_cooldown = json_debris['cooldown']
+    res.health = json_debris['health']
+    return res
+
+def set_turn(gs: GameState, turn: dict):
+    '''
+    Makes gs show the given turn of a replay.
+    '''
+    gs.turn = turn['turn_number']
+    gs.balance[Team.BLUE] = turn['blue_balance']
+    gs.balance[Team.RED] = turn['red_balance']
+    gs.health[Team.BLUE] = turn['blue_health']
+    gs.health[Team.RED] = turn['red_health']
+    gs.time_remaining[Team.BLUE] = turn['blue_time_remaining']
+    gs.time_remaining[Team.RED] = turn['red_time_remaining']
+
+    for team, prefix in [(Team.BLUE, 'blue'), (Team.RED, 'red')]:
+        gs.towers[team] = {}
+        for json_tower in turn[f'{prefix}_towers']:
+            tower = get_tower(team, json_tower)
+            gs.towers[team][tower.id] = tower
+        gs.debris[team] = {}
+        for json_debris in turn[f'{prefix}_debris']:
+            debris = get_debris(team, json_debris)
+            gs.debris[team][debris.id] = debris
+        gs.current_snipes[team] = turn[f'{prefix}_snipes']
+        gs.current_bombs[team] = turn[f'{prefix}_bombs']
@@ -0,0 +1,85 @@
+# Playing games again from their action logs
+# A ReplayedGame is a Game whose players are its action log: each turn goes through
+# Game.run_turn as usual, but instead of calling the bots it applies the actions
+# they took and sets the time they had left. After every turn, the state is checked
+# against the log, so a change to the engine that alters the outcome of a recorded
+# game is caught at the first turn that comes out differently.
+
+import os
+import time
+from dataclasses import dataclass
+from typing import Optional
+from src.action_log import ActionLogReader, decode_action, describe_mismatch, get_check
+from src.bot_worker import apply_actions
+from src.game import Game
+from src.game_constants import Team
+
+class ReplayedGame(Game):
+    '''
+    Game that takes its players' actions from an action log instead of running bots.
+    '''
+    def __init__(self, metadata: dict, map_path: Optional[str] = None, output_replay=False, replay_dir="replays",
+                 replay_format="json"):
+        map_path = map_path or os.path.join("maps", f"{metadata['map_name']}.awap24m")
+        self.record = None  # the log's record of the turn being played
+        super().__init__(metadata["blue_bot"], metadata["red_bot"], map_path, output_replay=output_replay,
+                         replay_dir=replay_dir, replay_format=replay_format, seed=metadata["seed"])
+
+    def load_players(self, blue_path: str, red_path: str):
+        # The bots aren't loaded; their names are all that's needed
+        self.blue_failed_init = False
+        self.red_failed_init = False
+        return blue_path, red_path
+
+    def call_player_code(self, team: Team):
+        controller = self.blue_controller if team == Team.BLUE else self.red_controller
+        actions = [decode_action(action) for action in self.record[team.name.lower()]]
+        apply_actions(controller, self.gs, actions)
+        self.gs.time_remaining[team] = self.record["time"][team.value]
+        return self.gs.time_remaining[team] > 0
+
+@dataclass
+class ResimulationResult:
+    turns: int
+    winner: Optional[str]
+    mismatch: Optional[str]  # where the game first went differently than logged, if it did
+    seconds: float
+
+def resimulate(path: str, map_path: Optional[str] = None, replay_dir="replays", replay_format="none") -> ResimulationResult:
+    '''
+    Plays the game in an action log again and checks it turns out the same. With a
+    replay_format other than none, the game is also written as a replay of that format.
+    '''
+    start = time.perf_counter()
+    with ActionLogReader(path) as log:
+        game = ReplayedGame(log.metadata, map_path, replay_format != "none", replay_dir, replay_format)
+        winner = None
+        mismatch = None
+        turns = 0
+        for record in log:
+            if winner is not None:
+                mismatch = f"turn {record['turn']}: the game ended on turn {game.gs.turn}"
+                break
+            game.record = record
+            try:
+                winner = game.run_turn()
+            except Exception as e:
+                mismatch = f"turn {record['turn']}: {type(e).__name__}: {e}"
+                break
+            turns += 1
+            game.replay.add_turn(game.gs, game.take_actions())
+            check = get_check(game.gs)
+            if game.gs.turn != record["turn"] or check != record["check"]:
+                mismatch = f"turn {record['turn']}: {describe_mismatch(record['check'], check)}"
+                break
+        result = log.result or {}
+
+    winner_name = winner.name.lower() if winner is not None else None
+    if turns == 0:
+        winner_name = result.get("winner")  # a bot failed to start, so no turns were played
+    elif mismatch is None and winner_name != result.get("winner"):
+        mismatch = f"winner {winner_name} != {result.get('winner')}"
+    if winner is not None:
+        game.replay.set_winner(winner)
+    game.replay.close()
+    return ResimulationResult(turns, winner_name, mismatch, time.perf_counter() - start)
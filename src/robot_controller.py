@@ -1,17 +1,22 @@
-import copy
-from typing import List
+from typing import Callable, List
 import math
+import numpy as np
 
-from src.debris import Debris
+from src.debris import DebrisView
 from src.game_exception import GameException
 from src.game_constants import SnipePriority, Team, TowerType, GameConstants
 from src.game_state import GameState
-from src.tower import Tower
+from src.map import MapView
+from src.tower import Tower, TowerView
 
 class RobotController:
-    def __init__(self, team: Team, game_state: GameState):
+    def __init__(self, team: Team, game_state: GameState, is_fork=False, check_types=True):
         self.__team = team
         self.__gs = game_state
+        self.__map_view = game_state.get_map_view()
+        self.__is_fork = is_fork
+        # Checks that arguments are ints, which trusted bots in training can skip
+        self.__check_types = check_types
     
     def get_ally_team(self) -> Team:
         return self.__team
@@ -22,38 +27,48 @@ class RobotController:
         else:
             return Team.BLUE
     
-    def get_map(self) -> list:
-        return copy.deepcopy(self.__gs.map)
+    def get_map(self) -> MapView:
+        return self.__map_view
     
-    def get_towers(self, team: Team) -> List[Tower]:
-        return copy.deepcopy(list(self.__gs.towers[team].values()))
+    def get_towers(self, team: Team) -> List[TowerView]:
+        '''
+        Returns read-only snapshots of a team's towers. They don't change when the
+        towers do, so call again after building, selling or attacking to see it.
+        '''
+        return [TowerView(tower) for tower in self.__gs.towers[team].values()]
     
-    def get_debris(self, team: Team) -> List[Debris]:
-        return copy.deepcopy(list(self.__gs.debris[team].values()))
+    def get_debris(self, team: Team) -> List[DebrisView]:
+        '''
+        Returns read-only snapshots of the debris on a team's path. They don't change
+        when the debris does, so call again after sniping or bombing to see it.
+        '''
+        return [DebrisView(deb) for deb in self.__gs.debris[team].values()]
 
-    def sense_debris_within_radius_squared(self, team: Team, x: int, y: int, r2: int) -> List[Debris]:
-        inRange: List[Debris] = []
-        for deb in self.__gs.debris[team].values():
-            if (deb.x - x)**2 + (deb.y - y)**2 <= r2:
-                inRange.append(copy.deepcopy(deb))
+    def sense_debris_within_radius_squared(self, team: Team, x: int, y: int, r2: int) -> List[DebrisView]:
+        '''
+        Returns snapshots of a team's debris within r2 of (x, y), as get_debris does.
+        '''
+        inRange = self.__gs.get_debris_within_radius_squared(team, x, y, r2)
+        return [DebrisView(deb) for deb in inRange]
 
-        return inRange
-
-    def sense_debris_in_range_of_tower(self, team: Team, tower_id: int) -> List[Debris]:
+    def sense_debris_in_range_of_tower(self, team: Team, tower_id: int) -> List[DebrisView]:
         if tower_id not in self.__gs.towers[team]:
             raise GameException(f"Tried to sense debris in range of non-existent tower: {tower_id}")
         tower = self.__gs.towers[team][tower_id]
         return self.sense_debris_within_radius_squared(team, tower.x, tower.y, tower.type.range)
 
-    def sense_towers_within_radius_squared(self, team: Team, x: int, y: int, r2: int) -> List[Tower]:
-        inRange: List[Tower] = []
+    def sense_towers_within_radius_squared(self, team: Team, x: int, y: int, r2: int) -> List[TowerView]:
+        '''
+        Returns snapshots of a team's towers within r2 of (x, y), as get_towers does.
+        '''
+        inRange: List[TowerView] = []
         for tower in self.__gs.towers[team].values():
             if (tower.x - x)**2 + (tower.y - y)**2 <= r2:
-                inRange.append(copy.deepcopy(tower))
+                inRange.append(TowerView(tower))
 
         return inRange
 
-    def sense_towers_in_range_of_tower(self, team: Team, tower_id: int) -> List[Tower]:
+    def sense_towers_in_range_of_tower(self, team: Team, tower_id: int) -> List[TowerView]:
         if tower_id not in self.__gs.towers[team]:
             raise GameException(f"Tried to sense towers in range of non-existent tower: {tower_id}")
         tower = self.__gs.towers[team][tower_id]
@@ -68,6 +83,69 @@ class RobotController:
     def get_turn(self) -> int:
         return self.__gs.turn
     
+    def idle_until(self, turn: int):
+        '''
+        Asks not to have play_turn called again until the given turn. play_turn is
+        called earlier if debris enters range of one of your gunships or bombers,
+        debris reaches the end of your path, or debris sent by the opponent spawns.
+        Skipped turns use none of your time pool.
+        '''
+        if self.__check_types and type(turn) != int:
+            raise GameException("idle_until(): turn must be an integer")
+        self.__gs.set_idle(self.__team, turn)
+    
+    def get_scheduled_debris(self, turn: int):
+        '''
+        Returns the natural debris that spawns for each team on this turn as
+        (cooldown, health), or None if none does.
+        '''
+        return self.__gs.debris_timeline.get(turn)
+
+    def get_scheduled_debris_between(self, start: int, end: int):
+        '''
+        Returns (number of debris, total health) of the natural debris that spawns for
+        each team in turns [start, end).
+        '''
+        timeline = self.__gs.debris_timeline
+        return timeline.count_between(start, end), timeline.health_between(start, end)
+
+    def get_next_scheduled_debris(self, turn: int, min_health=0) -> int:
+        '''
+        Returns the first turn at or after this one where natural debris with at least
+        min_health health spawns, e.g. the next boss.
+        '''
+        return self.__gs.debris_timeline.get_next(turn, min_health)
+
+    def fork(self) -> 'RobotController':
+        '''
+        Returns a controller over a private copy of the game, for trying out plans.
+        Actions taken through it and step() change only the copy.
+        '''
+        return RobotController(self.__team, self.__gs.fork(), is_fork=True, check_types=self.__check_types)
+
+    def step(self, turns: int = 1, play_turn: Callable[['RobotController'], None] = None,
+             enemy_play_turn: Callable[['RobotController'], None] = None) -> bool:
+        '''
+        Plays turns of a game returned by fork(), using the same turn logic as the engine.
+        After each turn's debris and income, play_turn and enemy_play_turn (if given) are
+        called with a controller over the fork for your team and the enemy's, in the usual
+        blue-then-red order. Returns True if a team ran out of health.
+        '''
+        if not self.__is_fork:
+            raise GameException("step() can only be called on a controller returned by fork()")
+        if self.__check_types and type(turns) != int:
+            raise GameException("step(): turns must be an integer")
+        enemy = RobotController(self.get_enemy_team(), self.__gs, is_fork=True, check_types=self.__check_types)
+        players = {self.__team: (self, play_turn), enemy.get_ally_team(): (enemy, enemy_play_turn)}
+        for _ in range(turns):
+            if self.__gs.advance_turn():
+                return True
+            for team in Team:
+                controller, play = players[team]
+                if play is not None:
+                    play(controller)
+        return False
+
     def get_debris_cost(self, cooldown: int, health: int) -> int:
         power = health/cooldown
         v1 = math.ceil(1/12 * health**2 / cooldown)
@@ -90,7 +168,7 @@ class RobotController:
             return False
         if self.__gs.balance[self.__team] < self.get_debris_cost(cooldown, health):
             return False
-        if type(cooldown) != int or type(health) != int:
+        if self.__check_types and (type(cooldown) != int or type(health) != int):
             return False
         if cooldown <= 0 or health <= 0:
             return False
@@ -103,22 +181,22 @@ class RobotController:
         self.__gs.sent_debris[self.__team] = (cooldown, health)
     
     def is_placeable(self, team: Team, x: int, y: int) -> bool:
-        if type(x) != int or type(y) != int:
+        if self.__check_types and (type(x) != int or type(y) != int):
             raise GameException("x and y must be integers (and can't be numpy.int64)")
         return self.__gs.is_placeable(team, x, y)
     
     def can_build_tower(self, tower_type: TowerType, x: int, y: int) -> bool:
         if self.__gs.balance[self.__team] < tower_type.cost:
             return False
-        if type(x) != int or type(y) != int:
+        if self.__check_types and (type(x) != int or type(y) != int):
             raise GameException("x and y must be integers (and can't be numpy.int64)")
         return self.is_placeable(self.__team, x, y)
     
     def build_tower(self, tower_type: TowerType, x: int, y: int):
         if not self.can_build_tower(tower_type, x, y):
             raise GameException("build_tower() called but can_build_tower() returned False")
-        tower = Tower(self.__team, tower_type, x, y)
-        self.__gs.towers[self.__team][tower.id] = tower
+        tower = Tower(self.__team, tower_type, x, y, self.__gs.allocate_tower_id(self.__team))
+        self.__gs.add_tower(tower)
         self.__gs.balance[self.__team] -= tower_type.cost
 
     def sell_tower(self, tower_id: int):
@@ -127,7 +205,7 @@ class RobotController:
             raise GameException("Cannot sell tower that doesn't exist")
         cost = my_towers[tower_id].type.cost
         self.__gs.balance[self.__team] += cost * GameConstants.REFUND_RATIO
-        del self.__gs.towers[self.__team][tower_id]
+        self.__gs.remove_tower(self.__team, tower_id)
     
     def get_time_remaining_at_start_of_turn(self, team: Team) -> float:
         return self.__gs.time_remaining[team]
@@ -139,11 +217,11 @@ class RobotController:
         # Are the ids valid?
         if tower_id not in my_towers:
             raise GameException("can_snipe(): Invalid tower id")
-        if debris_id not in my_debris:
+        row = my_debris.find(debris_id)
+        if row < 0:
             raise GameException("can_snipe(): Invalid debris id")
         
         tower = my_towers[tower_id]
-        debris = my_debris[debris_id]
 
         # Is the tower a gunship?
         if tower.type != TowerType.GUNSHIP:
@@ -154,8 +232,8 @@ class RobotController:
             return False
         
         # Is the debris in range?
-        dx = debris.x - tower.x
-        dy = debris.y - tower.y
+        dx = int(my_debris.get_x(row)) - tower.x
+        dy = int(my_debris.get_y(row)) - tower.y
         if dx**2 + dy**2 > TowerType.GUNSHIP.range:
             return False
         
@@ -171,7 +249,7 @@ class RobotController:
         tower.current_cooldown = TowerType.GUNSHIP.cooldown
 
         self.__gs.current_snipes[self.__team].append(((tower.x, tower.y), (debris.x, debris.y)))
-        self.__gs.damage_debris(debris_id, TowerType.GUNSHIP.damage)
+        self.__gs.damage_debris(self.__team, debris_id, TowerType.GUNSHIP.damage)
     
     def auto_snipe(self, tower_id: int, priority: SnipePriority):
         if tower_id not in self.__gs.towers[self.__team]:
@@ -180,29 +258,36 @@ class RobotController:
         if tower.type != TowerType.GUNSHIP:
             raise GameException("Auto sniping only works on Gunships")
 
-        # Get list of snipeable debris
-        debris = []
-        for deb in self.__gs.debris[self.__team].values():
-            if self.can_snipe(tower_id, deb.id):
-                debris.append(deb)
+        # Nothing is snipeable while the tower is on cooldown
+        if tower.current_cooldown > 0:
+            return
+
+        # Get rows of snipeable debris
+        debris = self.__gs.debris[self.__team]
+        rows = self.__gs.get_debris_rows_within_radius_squared(self.__team, tower.x, tower.y, TowerType.GUNSHIP.range)
         
-        if len(debris) == 0:
+        if len(rows) == 0:
             return
         
+        highest_priority = self.__get_snipe_target(debris, rows, tower, priority)
+        self.snipe(tower_id, int(debris.id[highest_priority]))
+
+    def __get_snipe_target(self, debris, rows: np.ndarray, tower: Tower, priority: SnipePriority) -> int:
+        # Returns the row the tower should snipe out of the given rows of the debris table
         if priority == SnipePriority.FIRST:
-            get_priority = lambda debris: debris.progress
+            priorities = debris.progress[rows]
         elif priority == SnipePriority.LAST:
-            get_priority = lambda debris: -debris.progress
+            priorities = -debris.progress[rows]
         elif priority == SnipePriority.CLOSE:
-            get_priority = lambda debris: -(debris.x - tower.x)**2 - (debris.y - tower.y)**2
+            priorities = -(debris.get_x(rows) - tower.x)**2 - (debris.get_y(rows) - tower.y)**2
         elif priority == SnipePriority.WEAK:
-            get_priority = lambda debris: -debris.total_health
+            priorities = -debris.total_health[rows]
         elif priority == SnipePriority.STRONG:
-            get_priority = lambda debris: debris.total_health
+            priorities = debris.total_health[rows]
         else:
             raise GameException("Invalid priority passed to auto_snipe")
-        highest_priority = max(debris, key=get_priority)
-        self.snipe(tower_id, highest_priority.id)
+        # argmax takes the first of equal priorities, i.e. the earliest spawned
+        return rows[np.argmax(priorities)]
     
     def can_bomb(self, tower_id: int):
         my_towers = self.__gs.towers[self.__team]
@@ -226,13 +311,7 @@ class RobotController:
         tower.current_cooldown = TowerType.BOMBER.cooldown
 
         self.__gs.current_bombs[self.__team].append((tower.x, tower.y))
-        ids_in_range = []
-        for deb in self.__gs.debris[self.__team].values():
-            distance = (tower.x - deb.x)**2 + (tower.y - deb.y)**2
-            if distance <= TowerType.BOMBER.range:
-                ids_in_range.append(deb.id)
-        for deb_id in ids_in_range:
-            self.__gs.damage_debris(deb_id, TowerType.BOMBER.damage)
+        self.__gs.damage_debris_in_range(self.__team, tower.x, tower.y, TowerType.BOMBER.range, TowerType.BOMBER.damage)
     
     def auto_bomb(self, tower_id: int):
         if tower_id not in self.__gs.towers[self.__team]:
@@ -242,8 +321,61 @@ class RobotController:
         if not self.can_bomb(tower_id):
             return
         
-        nearby_debris = self.sense_debris_in_range_of_tower(self.__team, tower_id)
+        nearby_debris = self.__gs.get_debris_rows_within_radius_squared(self.__team, tower.x, tower.y, tower.type.range)
         if len(nearby_debris) == 0:
             return
         
         self.bomb(tower_id)
+
+    def auto_attack(self, priority: SnipePriority = SnipePriority.FIRST, bombers_first=False) -> List[tuple]:
+        '''
+        Fires every ready gunship at the debris picked by priority and every ready bomber
+        with debris in range. Gives the same result as calling auto_snipe or auto_bomb on
+        each of your towers in order, but looks at the debris only once.
+
+        The damage of every shot is counted as it is fired, so no tower fires at debris
+        that earlier shots in the call destroyed, and a debris gets no more snipes than
+        it takes to destroy it. With bombers_first, all bombers fire before any gunship,
+        so gunships also pass over debris the bombs destroy instead of sniping it first.
+
+        Returns (tower id, debris id) for each gunship that fired and (tower id, None) for
+        each bomber that fired, in the order they fired.
+        '''
+        if not isinstance(priority, SnipePriority):
+            raise GameException("Invalid priority passed to auto_attack")
+        towers = [
+            tower for tower in self.__gs.towers[self.__team].values()
+            if tower.type in [TowerType.GUNSHIP, TowerType.BOMBER] and tower.current_cooldown <= 0
+        ]
+        if bombers_first:
+            towers.sort(key=lambda tower: tower.type != TowerType.BOMBER)
+        debris = self.__gs.debris[self.__team]
+        if len(towers) == 0 or len(debris) == 0:
+            return []
+
+        # Damage is tracked in a copy of the health column, written back once at the end.
+        # Debris it brings to 0 are no longer targets for the towers after
+        health = debris.health.copy()
+        alive = np.ones(len(debris), dtype=bool)
+        fired = []
+        for tower in towers:
+            in_range = self.__gs.get_path_in_range(tower.x, tower.y, tower.type.range)[debris.progress]
+            rows = (in_range & alive).nonzero()[0]
+            if len(rows) == 0:
+                continue
+            if tower.type == TowerType.GUNSHIP:
+                row = self.__get_snipe_target(debris, rows, tower, priority)
+                tower.current_cooldown = TowerType.GUNSHIP.cooldown
+                target = (int(debris.get_x(row)), int(debris.get_y(row)))
+                self.__gs.current_snipes[self.__team].append(((tower.x, tower.y), target))
+                health[row] -= TowerType.GUNSHIP.damage
+                alive[row] = health[row] > 0
+                fired.append((tower.id, int(debris.id[row])))
+            else:
+                tower.current_cooldown = TowerType.BOMBER.cooldown
+                self.__gs.current_bombs[self.__team].append((tower.x, tower.y))
+                health[rows] -= TowerType.BOMBER.damage
+                alive[rows] = health[rows] > 0
+                fired.append((tower.id, None))
+        debris.update_health(health)
+        return fired
@@ -0,0 +1,158 @@
+# Runs many headless games over a matrix of bots and maps across a process pool
+
+import contextlib
+import csv
+import itertools
+import multiprocessing
+import os
+import random
+import time
+from dataclasses import dataclass
+from typing import List
+from src.game import Game
+from src.game_constants import Team
+
+@dataclass
+class Match:
+    blue_path: str
+    red_path: str
+    map_path: str
+    repeat: int
+    seed: int = None
+
+@dataclass
+class MatchResult:
+    blue_bot: str
+    red_bot: str
+    map_name: str
+    repeat: int
+    winner: str
+    winner_bot: str
+    turns: int
+    blue_health: int
+    red_health: int
+    blue_balance: float
+    red_balance: float
+    seed: int
+    seconds: float
+    turns_per_sec: float
+
+def get_bot_name(path: str) -> str:
+    return os.path.basename(path).split(".")[0]
+
+def get_matches(bots: List[str], maps: List[str], repeats: int, self_play=False, seed=None) -> List[Match]:
+    '''
+    Returns every (blue, red, map, repeat) combination. Each pair of distinct bots
+    plays on both sides of every map. With a seed, every match gets its own seed drawn
+    from it, so the whole tournament can be played again with the same results.
+    '''
+    rng = random.Random(seed) if seed is not None else None
+    matches = []
+    for map_path in maps:
+        for blue_path, red_path in itertools.product(bots, bots):
+            if blue_path == red_path and not self_play:
+                continue
+            for repeat in range(repeats):
+                match_seed = rng.randrange(2**32) if rng is not None else None
+                matches.append(Match(blue_path, red_path, map_path, repeat, match_seed))
+    return matches
+
+def run_match(match: Match, output_replay=False, render=False, quiet=True, replay_dir="replays", replay_format="json",
+              timing_dir=None, training=False, check_types=True) -> MatchResult:
+    start = time.time()
+    with open(os.devnull, "w") as devnull:
+        with contextlib.redirect_stdout(devnull) if quiet else contextlib.nullcontext():
+            game = Game(
+                blue_path=match.blue_path,
+                red_path=match.red_path,
+                map_path=match.map_path,
+                output_replay=output_replay,
+                render=render,
+                replay_dir=replay_dir,
+                replay_format=replay_format,
+                seed=match.seed,
+                timing=timing_dir is not None,
+                timing_dir=timing_dir,
+                training=training,
+                check_types=check_types
+            )
+            winner = game.run_game()
+
+    blue_bot = get_bot_name(match.blue_path)
+    red_bot = get_bot_name(match.red_path)
+    return MatchResult(
+        blue_bot=blue_bot,
+        red_bot=red_bot,
+        map_name=game.map.name,
+        repeat=match.repeat,
+        winner="blue" if winner == Team.BLUE else "red",
+        winner_bot=blue_bot if winner == Team.BLUE else red_bot,
+        turns=game.gs.turn,
+        blue_health=game.gs.health[Team.BLUE],
+        red_health=game.gs.health[Team.RED],
+        blue_balance=game.gs.balance[Team.BLUE],
+        red_balance=game.gs.balance[Team.RED],
+        seed=game.seed,
+        seconds=time.time() - start,
+        turns_per_sec=round(game.get_turns_per_sec(), 1)
+    )
+
+def _run_match_task(args) -> MatchResult:
+    match, output_replay, render, quiet, replay_dir, replay_format, timing_dir, training, check_types = args
+    return run_match(match, output_replay, render, quiet, replay_dir, replay_format, timing_dir, training, check_types)
+
+def run_tournament(matches: List[Match], num_workers: int, output_replay=False, render=False, quiet=True,
+                   replay_dir="replays", replay_format="json", timing_dir=None, training=False, check_types=True) -> List[MatchResult]:
+    tasks = [(match, output_replay, render, quiet, replay_dir, replay_format, timing_dir, training, check_types) for match in matches]
+    results = []
+    # Ids and randomness belong to each game, so a worker process can play many games
+    with multiprocessing.Pool(num_workers) as pool:
+        for result in pool.imap_unordered(_run_match_task, tasks):
+            results.append(result)
+            print(f"[{len(results)}/{len(tasks)}] {result.blue_bot} vs {result.red_bot} on {result.map_name}: "
+                  f"{result.winner_bot} wins in {result.turns} turns ({result.seconds:.1f}s)")
+    results.sort(key=lambda result: (result.map_name, result.blue_bot, result.red_bot, result.repeat))
+    return results
+
+def summarize(results: List[MatchResult]) -> List[dict]:
+    '''
+    Returns one row per bot with its games, wins, losses and win rate overall and per map.
+    '''
+    rows = {}
+    for result in results:
+        for bot in {result.blue_bot, result.red_bot}:
+            for map_name in ["all", result.map_name]:
+                key = (bot, map_name)
+                if key not in rows:
+                    rows[key] = {"bot": bot, "map": map_name, "games": 0, "wins": 0, "losses": 0}
+                rows[key]["games"] += 1
+                if result.blue_bot == result.red_bot:
+                    continue  # self-play counts as a game but not as a win or loss
+                if result.winner_bot == bot:
+                    rows[key]["wins"] += 1
+                else:
+                    rows[key]["losses"] += 1
+    summary = sorted(rows.values(), key=lambda row: (row["map"] != "all", row["map"], -row["wins"], row["bot"]))
+    for row in summary:
+        row["win_rate"] = round(row["wins"] / row["games"], 4)
+    return summary
+
+def get_throughput(results: List[MatchResult]) -> dict:
+    '''
+    Returns how fast the games were played: turns per second while playing, and games
+    per hour of one core (including loading the bots).
+    '''
+    seconds = sum(result.seconds for result in results)
+    play_seconds = sum(result.turns / result.turns_per_sec for result in results if result.turns_per_sec)
+    return {
+        "turns_per_sec": sum(result.turns for result in results) / play_seconds if play_seconds else 0,
+        "games_per_core_hour": len(results) * 3600 / seconds if seconds else 0
+    }
+
+def write_csv(path: str, rows: List[dict]):
+    if len(rows) == 0:
+        return
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+        writer.writeheader()
+        writer.writerows(rows)
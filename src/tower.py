@@ -1,19 +1,62 @@
+from __future__ import annotations
+import copy
 from src.game_constants import Team, TowerType
+from src.game_exception import GameException
 
 class Tower:
-    id_counter = 0
-
-    def __init__(self, team: Team, type: TowerType, x: int, y: int):
-        self.id = self.increment()
+    def __init__(self, team: Team, type: TowerType, x: int, y: int, id: int):
+        self.id = id
         self.team = team
         self.type = type
         self.x = x
         self.y = y
         self.current_cooldown = 1.0
-    
-    @staticmethod
-    def increment() -> int:
-        res = Tower.id_counter
-        Tower.id_counter += 1
-        return res
-    
\ No newline at end of file
+
+
+class TowerView:
+    '''
+    Read-only view of a Tower handed to players instead of a deep copy.
+    Attributes reflect the tower at the time it was returned, like DebrisView.
+    '''
+    __slots__ = ('_tower',)
+
+    def __init__(self, tower: Tower):
+        # A shallow copy is enough: every attribute of a Tower is immutable
+        object.__setattr__(self, '_tower', copy.copy(tower))
+
+    @property
+    def id(self) -> int:
+        return self._tower.id
+
+    @property
+    def team(self) -> Team:
+        return self._tower.team
+
+    @property
+    def type(self) -> TowerType:
+        return self._tower.type
+
+    @property
+    def x(self) -> int:
+        return self._tower.x
+
+    @property
+    def y(self) -> int:
+        return self._tower.y
+
+    @property
+    def current_cooldown(self) -> float:
+        return self._tower.current_cooldown
+
+    def __setattr__(self, name, value):
+        raise GameException("Towers returned by RobotController are read-only")
+
+    def __delattr__(self, name):
+        raise GameException("Towers returned by RobotController are read-only")
+
+    def __deepcopy__(self, memo):
+        # Deep copying a view gives the player their own mutable snapshot
+        return copy.deepcopy(self._tower, memo)
+
+    def __repr__(self) -> str:
+        return f"TowerView(id={self.id}, team={self.team}, type={self.type}, x={self.x}, y={self.y})"
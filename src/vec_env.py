@@ -0,0 +1,479 @@
+# Many games stepped together, for training learning bots
+# A GameBatch plays several independent games in lock-step in one process; a VecEnv
+# splits its games between worker processes that each run a GameBatch, so stepping
+# scales with the number of cores. In every game an agent, whose actions come from
+# the caller, plays against an opponent bot (or against no one).
+# Observations are fixed-shape numpy arrays with one row per game, kept in memory
+# shared with the workers, so only the actions go through the pipes:
+#   grid        -> float32 [games, len(GRID_CHANNELS), width, height], indexed [x][y]
+#   scalars     -> float32 [games, len(SCALARS)]
+#   action_mask -> bool [games, num_actions], the actions that can be taken
+# "own" is the agent's side of the board and "enemy" the opponent's. Maps of different
+# sizes are padded to the largest one, off_map marking the padding.
+# Actions are one integer per game (see ActionSpace):
+#   0                                -> do nothing
+#   1 + (t * width + x) * height + y -> build TOWER_TYPES[t] at (x, y)
+#   1 + (4 * width + x) * height + y -> sell the agent's tower at (x, y)
+#   1 + 5 * width * height + i       -> send debris_options[i] (cooldown, health)
+# Actions that can't be taken are skipped and reported in info["invalid"].
+# Each step plays one turn: the agent's action followed by its gunships and bombers
+# firing at the first debris in range, the opponent's play_turn (in the usual
+# blue-then-red order), then the next turn's debris, income and movement. A game
+# that ends is started again straight away, so the observation returned alongside
+# done is the first of the next game.
+
+import contextlib
+import ctypes
+import multiprocessing
+import os
+import random
+import traceback
+from multiprocessing.connection import Connection
+from typing import List, Optional
+import numpy as np
+from src.game import import_file
+from src.game_constants import GameConstants, SnipePriority, Team, Tile, TowerType
+from src.game_state import GameState
+from src.map import Map
+from src.robot_controller import RobotController
+
+TOWER_TYPES = [TowerType.SOLAR_FARM, TowerType.GUNSHIP, TowerType.BOMBER, TowerType.REINFORCER]
+GRID_CHANNELS = (
+    ["off_map", "path", "space"]
+    + [f"own_{tower_type.name.lower()}" for tower_type in TOWER_TYPES]
+    + [f"enemy_{tower_type.name.lower()}" for tower_type in TOWER_TYPES]
+    + ["own_debris", "own_debris_health", "enemy_debris", "enemy_debris_health"]
+)
+SCALARS = ["turn", "own_balance", "enemy_balance", "own_health", "enemy_health", "can_send_debris"]
+# Debris the agent can send, as (cooldown, health), unless others are given
+DEBRIS_OPTIONS = [(10, 50), (5, 100), (2, 100), (1, 200)]
+
+OWN_TOWERS = GRID_CHANNELS.index("own_solar_farm")
+ENEMY_TOWERS = GRID_CHANNELS.index("enemy_solar_farm")
+OWN_DEBRIS = GRID_CHANNELS.index("own_debris")
+ENEMY_DEBRIS = GRID_CHANNELS.index("enemy_debris")
+
+class ActionSpace:
+    '''
+    Numbers the actions of a game on a board of the given size.
+    '''
+    def __init__(self, width: int, height: int, debris_options: list):
+        self.width = width
+        self.height = height
+        self.debris_options = debris_options
+        self.board_size = width * height
+        self.sell_start = 1 + len(TOWER_TYPES) * self.board_size
+        self.send_start = self.sell_start + self.board_size
+        self.num_actions = self.send_start + len(debris_options)
+
+    def build(self, tower_type: TowerType, x: int, y: int) -> int:
+        return 1 + (TOWER_TYPES.index(tower_type) * self.width + x) * self.height + y
+
+    def sell(self, x: int, y: int) -> int:
+        return self.sell_start + x * self.height + y
+
+    def send_debris(self, option: int) -> int:
+        return self.send_start + option
+
+    def decode(self, action: int) -> tuple:
+        '''
+        Returns an action as ("none",), ("build", tower type, x, y), ("sell", x, y) or
+        ("send", cooldown, health).
+        '''
+        if not 0 <= action < self.num_actions:
+            raise Exception(f"Action {action} is not between 0 and {self.num_actions - 1}")
+        if action == 0:
+            return ("none",)
+        if action < self.sell_start:
+            t, tile = divmod(action - 1, self.board_size)
+            return ("build", TOWER_TYPES[t], tile // self.height, tile % self.height)
+        if action < self.send_start:
+            tile = action - self.sell_start
+            return ("sell", tile // self.height, tile % self.height)
+        return ("send", *self.debris_options[action - self.send_start])
+
+def get_board_size(maps: List[Map]) -> tuple:
+    return max(map.width for map in maps), max(map.height for map in maps)
+
+def get_static_channels(map: Map, width: int, height: int) -> np.ndarray:
+    # The channels that stay the same for the whole game: off_map, path and space
+    channels = np.zeros((3, width, height), dtype=np.float32)
+    channels[0] = 1
+    tiles = map.tile_array
+    channels[0, :map.width, :map.height] = 0
+    channels[1, :map.width, :map.height] = tiles == Tile.PATH.value
+    channels[2, :map.width, :map.height] = tiles == Tile.SPACE.value
+    return channels
+
+class Buffers:
+    '''
+    The observations and step results of every game in a VecEnv, one row per game.
+    With shared, the arrays live in memory that worker processes started afterwards
+    can write to.
+    '''
+    FIELDS = {
+        "grid": (np.float32, ctypes.c_float),
+        "scalars": (np.float32, ctypes.c_float),
+        "action_mask": (np.bool_, ctypes.c_bool),
+        "reward": (np.float32, ctypes.c_float),
+        "done": (np.bool_, ctypes.c_bool),
+        "truncated": (np.bool_, ctypes.c_bool),
+        "won": (np.bool_, ctypes.c_bool),
+        "invalid": (np.bool_, ctypes.c_bool),
+        "turns": (np.int32, ctypes.c_int32)
+    }
+
+    def __init__(self, num_games: int, space: ActionSpace, shared=False):
+        self.shapes = {
+            "grid": (num_games, len(GRID_CHANNELS), space.width, space.height),
+            "scalars": (num_games, len(SCALARS)),
+            "action_mask": (num_games, space.num_actions)
+        }
+        self.raw = None
+        if shared:
+            self.raw = {}
+            for name, (_, ctype) in self.FIELDS.items():
+                self.raw[name] = multiprocessing.RawArray(ctype, int(np.prod(self.get_shape(name, num_games))))
+        self.num_games = num_games
+        self.make_arrays()
+
+    def get_shape(self, name: str, num_games: int) -> tuple:
+        return self.shapes.get(name, (num_games,))
+
+    def make_arrays(self):
+        for name, (dtype, _) in self.FIELDS.items():
+            shape = self.get_shape(name, self.num_games)
+            if self.raw is None:
+                array = np.zeros(shape, dtype=dtype)
+            else:
+                array = np.frombuffer(self.raw[name], dtype=dtype).reshape(shape)
+            setattr(self, name, array)
+
+    def __getstate__(self):
+        # Workers get the shared memory itself, not a copy of the arrays over it
+        if self.raw is None:
+            raise Exception("Bug in game engine. Buffers that aren't shared were sent to a worker")
+        return {"shapes": self.shapes, "raw": self.raw, "num_games": self.num_games}
+
+    def __setstate__(self, state: dict):
+        self.__dict__.update(state)
+        self.make_arrays()
+
+class TrainingGame:
+    '''
+    One game of a GameBatch, written to row `row` of the buffers. maps holds
+    (path, Map, static channels) for each map the game can be played on. The
+    opponent's prints go to output, if given; it is owned by the GameBatch.
+    '''
+    def __init__(self, maps: List[tuple], space: ActionSpace, buffers: Buffers,
+                 row: int, seed: int, team: Team, opponent_module=None, max_turns: Optional[int] = None,
+                 check_types=True, output=None):
+        self.maps = maps
+        self.space = space
+        self.buffers = buffers
+        self.row = row
+        self.random = random.Random(seed)
+        self.team = team
+        self.enemy = Team.RED if team == Team.BLUE else Team.BLUE
+        self.opponent_module = opponent_module
+        self.max_turns = max_turns
+        self.check_types = check_types
+        self.output = output
+        self.debris_costs = None
+
+    def reset(self):
+        map_path, self.map, self.static = self.maps[self.random.randrange(len(self.maps))]
+        self.gs = GameState(self.map)
+        # The agent's actions are decoded from ints, so its controller can skip type checks
+        self.controller = RobotController(self.team, self.gs, check_types=False)
+        self.opponent = None
+        if self.opponent_module is not None:
+            self.opponent = self.opponent_module.BotPlayer(Map(map_path))
+            self.opponent_controller = RobotController(self.enemy, self.gs, check_types=self.check_types)
+        if self.debris_costs is None:
+            self.debris_costs = [self.controller.get_debris_cost(*option) for option in self.space.debris_options]
+        self.gs.advance_turn()
+        self.write_observation()
+
+    def apply_action(self, action: int) -> bool:
+        '''
+        Takes the agent's action through its RobotController. Returns False if it can't be taken.
+        '''
+        decoded = self.space.decode(action)
+        controller = self.controller
+        if decoded[0] == "build":
+            _, tower_type, x, y = decoded
+            if not controller.can_build_tower(tower_type, x, y):
+                return False
+            controller.build_tower(tower_type, x, y)
+        elif decoded[0] == "sell":
+            _, x, y = decoded
+            for tower in self.gs.towers[self.team].values():
+                if tower.x == x and tower.y == y:
+                    controller.sell_tower(tower.id)
+                    return True
+            return False
+        elif decoded[0] == "send":
+            _, cooldown, health = decoded
+            if not controller.can_send_debris(cooldown, health):
+                return False
+            controller.send_debris(cooldown, health)
+        return True
+
+    def call_opponent(self):
+        # As in training mode: no time limit, and errors only end the bot's turn
+        with contextlib.redirect_stdout(self.output) if self.output else contextlib.nullcontext():
+            try:
+                self.opponent.play_turn(self.opponent_controller)
+            except Exception:
+                traceback.print_exc()
+
+    def step(self, action: int):
+        gs = self.gs
+        health, enemy_health = gs.health[self.team], gs.health[self.enemy]
+        valid = True
+        for team in Team:
+            if team == self.team:
+                valid = self.apply_action(action)
+                self.controller.auto_attack(SnipePriority.FIRST)
+            elif self.opponent is not None and not gs.is_idle(team):
+                self.call_opponent()
+            gs.watch_idle(team)
+        ended = gs.advance_turn()
+        truncated = not ended and self.max_turns is not None and gs.turn >= self.max_turns
+
+        # Damage dealt minus damage taken, as a fraction of the starting health, then 1 for a win or -1 for a loss
+        damage = (enemy_health - gs.health[self.enemy]) - (health - gs.health[self.team])
+        reward = damage / GameConstants.STARTING_HEALTH
+        buffers, row = self.buffers, self.row
+        buffers.done[row] = ended or truncated
+        buffers.truncated[row] = truncated
+        buffers.invalid[row] = not valid
+        buffers.turns[row] = gs.turn
+        buffers.won[row] = False
+        if ended or truncated:
+            won = gs.calculate_winner(self.random) == self.team
+            buffers.won[row] = won
+            reward += 1 if won else -1
+            self.reset()
+        else:
+            self.write_observation()
+        buffers.reward[row] = reward
+
+    def write_observation(self):
+        gs = self.gs
+        buffers, row = self.buffers, self.row
+        grid = buffers.grid[row]
+        grid[:3] = self.static
+        grid[3:] = 0
+        for team, towers_channel, debris_channel in [(self.team, OWN_TOWERS, OWN_DEBRIS), (self.enemy, ENEMY_TOWERS, ENEMY_DEBRIS)]:
+            for tower in gs.towers[team].values():
+                grid[towers_channel + TOWER_TYPES.index(tower.type), tower.x, tower.y] = 1
+            debris = gs.debris[team]
+            if len(debris) > 0:
+                path_length = debris.path_length
+                grid[debris_channel, debris.path_x, debris.path_y] = np.bincount(debris.progress, minlength=path_length)[:path_length]
+                health = np.bincount(debris.progress, weights=debris.health, minlength=path_length)[:path_length]
+                grid[debris_channel + 1, debris.path_x, debris.path_y] = health
+
+        balance = gs.balance[self.team]
+        can_send = gs.sent_debris[self.team] is None
+        buffers.scalars[row] = [gs.turn, balance, gs.balance[self.enemy], gs.health[self.team], gs.health[self.enemy], can_send]
+
+        # Towers can go on space tiles without one of the agent's towers
+        space = self.space
+        mask = buffers.action_mask[row]
+        mask[:] = False
+        mask[0] = True
+        own_towers = grid[OWN_TOWERS:OWN_TOWERS + len(TOWER_TYPES)].any(axis=0)
+        free = ((grid[2] > 0) & ~own_towers).ravel()
+        for t, tower_type in enumerate(TOWER_TYPES):
+            if balance >= tower_type.cost:
+                start = 1 + t * space.board_size
+                mask[start:start + space.board_size] = free
+        mask[space.sell_start:space.send_start] = own_towers.ravel()
+        if can_send:
+            mask[space.send_start:] = [balance >= cost for cost in self.debris_costs]
+
+class GameBatch:
+    '''
+    Games played in lock-step in this process, written to rows start to
+    start + len(seeds) of the buffers.
+    '''
+    def __init__(self, map_paths: List[str], seeds: List[int], buffers: Buffers, start=0, team=Team.BLUE,
+                 opponent_path: Optional[str] = None, max_turns: Optional[int] = None,
+                 debris_options: Optional[list] = None, check_types=True, quiet=True):
+        loaded = [Map(path) for path in map_paths]
+        width, height = get_board_size(loaded)
+        self.space = ActionSpace(width, height, debris_options or DEBRIS_OPTIONS)
+        maps = [(path, map, get_static_channels(map, width, height)) for path, map in zip(map_paths, loaded)]
+        opponent_module = None
+        if opponent_path is not None:
+            opponent_module = import_file(os.path.basename(opponent_path).split(".")[0], opponent_path)
+        self.start = start
+        # One handle shared by all the games, closed by close()
+        self.output = open(os.devnull, "w") if quiet else None
+        self.games = [
+            TrainingGame(maps, self.space, buffers, start + i, seed, team, opponent_module,
+                         max_turns, check_types, self.output)
+            for i, seed in enumerate(seeds)
+        ]
+
+    def reset(self):
+        for game in self.games:
+            game.reset()
+
+    def step(self, actions):
+        for game, action in zip(self.games, actions):
+            game.step(int(action))
+
+    def close(self):
+        if self.output is not None:
+            self.output.close()
+
+def worker_main(conn: Connection, buffers: Buffers, start: int, seeds: List[int], kwargs: dict):
+    try:
+        batch = GameBatch(seeds=seeds, buffers=buffers, start=start, **kwargs)
+    except Exception:
+        conn.send(traceback.format_exc())
+        return
+    conn.send(None)
+
+    while True:
+        command, actions = conn.recv()
+        if command == "close":
+            batch.close()
+            return
+        try:
+            if command == "reset":
+                batch.reset()
+            else:
+                batch.step(actions)
+            conn.send(None)
+        except Exception:
+            conn.send(traceback.format_exc())
+
+class VecEnv:
+    '''
+    num_games games played in lock-step, each on one of map_paths picked at random when
+    it starts, by an agent against the bot at opponent_path (or no one). With workers,
+    the games are split between that many processes. With quiet, what the opponent
+    prints is hidden; its errors are still shown.
+    reset() and step(actions) return the same arrays each time, overwritten by the next
+    call; copy what needs keeping.
+    '''
+    def __init__(self, map_paths: List[str], num_games: int, opponent_path: Optional[str] = None, team=Team.BLUE,
+                 num_workers=0, seed: Optional[int] = None, max_turns: Optional[int] = None,
+                 debris_options: Optional[list] = None, check_types=True, quiet=True):
+        if num_games < 1:
+            raise Exception("A VecEnv needs at least one game")
+        rng = random.Random(seed)
+        seeds = [rng.randrange(2**32) for _ in range(num_games)]
+        width, height = get_board_size([Map(path) for path in map_paths])
+        self.space = ActionSpace(width, height, debris_options or DEBRIS_OPTIONS)
+        self.num_games = num_games
+        self.num_workers = min(num_workers, num_games)
+        self.buffers = Buffers(num_games, self.space, shared=self.num_workers > 0)
+        kwargs = {
+            "map_paths": map_paths,
+            "team": team,
+            "opponent_path": opponent_path,
+            "max_turns": max_turns,
+            "debris_options": debris_options,
+            "check_types": check_types,
+            "quiet": quiet
+        }
+
+        self.batch = None
+        self.workers = []
+        if self.num_workers == 0:
+            self.batch = GameBatch(seeds=seeds, buffers=self.buffers, **kwargs)
+            return
+        # Contiguous rows for each worker, as even as they can be
+        bounds = [num_games * i // self.num_workers for i in range(self.num_workers + 1)]
+        for i in range(self.num_workers):
+            conn, child_conn = multiprocessing.Pipe()
+            process = multiprocessing.Process(
+                target=worker_main,
+                args=(child_conn, self.buffers, bounds[i], seeds[bounds[i]:bounds[i + 1]], kwargs),
+                name=f"env-worker-{i}",
+                daemon=True
+            )
+            process.start()
+            child_conn.close()
+            self.workers.append((conn, process, bounds[i], bounds[i + 1]))
+        self.wait_for_workers()
+
+    def wait_for_workers(self):
+        errors = []
+        for conn, process, _, _ in self.workers:
+            try:
+                error = conn.recv()
+            except EOFError:
+                error = f"{process.name} died"
+            if error is not None:
+                errors.append(error)
+        if errors:
+            self.close()
+            raise Exception("Game worker failed:\n" + "\n".join(errors))
+
+    def get_observation(self) -> dict:
+        buffers = self.buffers
+        return {"grid": buffers.grid, "scalars": buffers.scalars, "action_mask": buffers.action_mask}
+
+    def reset(self) -> dict:
+        '''
+        Starts every game over and returns the first observations.
+        '''
+        if self.batch is not None:
+            self.batch.reset()
+        else:
+            for conn, _, _, _ in self.workers:
+                conn.send(("reset", None))
+            self.wait_for_workers()
+        return self.get_observation()
+
+    def step(self, actions) -> tuple:
+        '''
+        Plays a turn of every game, with one action per game, and returns
+        (observation, reward, done, info), info holding per-game arrays:
+          truncated -> the game ended by reaching max_turns
+          won       -> the agent won the game that just ended
+          invalid   -> the action couldn't be taken, so nothing was done
+          turns     -> turns played in the game so far, or in all of it if it ended
+        '''
+        actions = np.asarray(actions)
+        if actions.shape != (self.num_games,):
+            raise Exception(f"Expected {self.num_games} actions, got an array of shape {actions.shape}")
+        if self.batch is not None:
+            self.batch.step(actions)
+        else:
+            # Every worker plays its games at the same time
+            for conn, _, start, end in self.workers:
+                conn.send(("step", actions[start:end]))
+            self.wait_for_workers()
+        buffers = self.buffers
+        info = {"truncated": buffers.truncated, "won": buffers.won, "invalid": buffers.invalid, "turns": buffers.turns}
+        return self.get_observation(), buffers.reward, buffers.done, info
+
+    def close(self):
+        if self.batch is not None:
+            self.batch.close()
+        for conn, process, _, _ in self.workers:
+            if process.is_alive():
+                try:
+                    conn.send(("close", None))
+                except OSError:
+                    pass
+                process.join(1)
+            if process.is_alive():
+                process.kill()
+                process.join()
+            conn.close()
+        self.workers = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()